@@ -0,0 +1,150 @@
+"""
+Bytes-on-wire vs CPU per codec and level for proxy responses.
+
+Two synthetic workloads shaped like real traffic:
+- json: one large non-streaming chat completion with several tool calls
+- sse:  a chat-completion stream of small content deltas, flushed per chunk
+        the way CompressionMiddleware sends them
+
+    python benchmarks/compression.py [--runs 5] [--size-kb 256] [--chunks 2000]
+
+brotli / zstd rows appear only when those packages are installed.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.compression import CODEC_CLASSES  # noqa: E402
+
+LEVELS = {
+    "gzip": [1, 6, 9],
+    "br": [1, 4, 6, 9],
+    "zstd": [1, 3, 9, 19],
+}
+
+WORDS = (
+    "def class return import from self async await for in if else elif try except finally with as "
+    "None True False yield lambda raise assert pass config payload headers response request stream "
+    "buffer chunk delta content model usage tokens tool_calls function arguments index choices "
+    "the a to of and is that this it we should file path line error value result data list dict"
+).split()
+
+
+def _text(rng: random.Random, n_words: int) -> str:
+    lines, line = [], []
+    for _ in range(n_words):
+        line.append(rng.choice(WORDS))
+        if rng.random() < 0.12:
+            lines.append("    " * rng.randint(0, 3) + " ".join(line))
+            line = []
+    lines.append(" ".join(line))
+    return "\n".join(lines)
+
+
+def json_workload(size_kb: int, seed: int = 7) -> bytes:
+    """A chat completion whose tool calls carry file contents, ~size_kb on the wire."""
+    rng = random.Random(seed)
+    tool_calls = []
+    per_call = max(1, size_kb * 1024 // 8 // 6)  # ~6 bytes per word, 8 calls
+    for i in range(8):
+        args = {"path": f"src/module_{i}.py", "content": _text(rng, per_call)}
+        tool_calls.append({
+            "id": f"call_{rng.getrandbits(64):016x}",
+            "type": "function",
+            "function": {"name": "write_file", "arguments": json.dumps(args)},
+        })
+    completion = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": 1756971574,
+        "model": "gpt-5",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": None, "tool_calls": tool_calls},
+            "finish_reason": "tool_calls",
+        }],
+        "usage": {"prompt_tokens": 12000, "completion_tokens": 9000, "total_tokens": 21000},
+    }
+    return json.dumps(completion, indent=2).encode()
+
+
+def sse_workload(chunks: int, seed: int = 11) -> List[bytes]:
+    """Content-delta SSE frames as the proxy forwards them."""
+    rng = random.Random(seed)
+    frames = []
+    for i in range(chunks):
+        obj = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 1756971574,
+            "model": "gpt-5",
+            "choices": [{"index": 0, "delta": {"content": " " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))},
+                         "finish_reason": None}],
+        }
+        frames.append(f"data: {json.dumps(obj, separators=(',', ':'))}\n".encode())
+    return frames
+
+
+def _measure(fn: Callable[[], int], runs: int) -> Tuple[int, float]:
+    """Return (output bytes, median CPU seconds) of `fn` over `runs`."""
+    times, size = [], 0
+    for _ in range(runs):
+        started = time.process_time()
+        size = fn()
+        times.append(time.process_time() - started)
+    return size, statistics.median(times)
+
+
+def bench(codec_name: str, level: int, body: bytes, frames: List[bytes], runs: int) -> Dict[str, float]:
+    codec = CODEC_CLASSES[codec_name](level)
+
+    def whole() -> int:
+        return len(codec.compress(body))
+
+    def streamed() -> int:
+        encoder = codec.encoder()
+        total = sum(len(encoder.chunk(frame)) for frame in frames)
+        return total + len(encoder.finish())
+
+    json_bytes, json_cpu = _measure(whole, runs)
+    sse_bytes, sse_cpu = _measure(streamed, runs)
+    return {"json_bytes": json_bytes, "json_cpu": json_cpu, "sse_bytes": sse_bytes, "sse_cpu": sse_cpu}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--chunks", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    body = json_workload(args.size_kb)
+    frames = sse_workload(args.chunks)
+    sse_raw = sum(len(f) for f in frames)
+    print(f"json: {len(body)} bytes uncompressed; sse: {len(frames)} frames, {sse_raw} bytes uncompressed")
+    print(f"missing codecs: {', '.join(sorted(set(LEVELS) - set(CODEC_CLASSES))) or 'none'}\n")
+
+    print(f"{'codec':<6}{'level':>6} | {'json bytes':>11}{'ratio':>7}{'cpu ms':>9}{'MB/s':>8} | "
+          f"{'sse bytes':>11}{'ratio':>7}{'cpu ms':>9}{'us/frame':>10}")
+    for name, levels in LEVELS.items():
+        if name not in CODEC_CLASSES:
+            continue
+        for level in levels:
+            r = bench(name, level, body, frames, args.runs)
+            mbps = len(body) / r["json_cpu"] / 1e6 if r["json_cpu"] else float("inf")
+            print(f"{name:<6}{level:>6} | {r['json_bytes']:>11}{len(body) / r['json_bytes']:>7.2f}"
+                  f"{r['json_cpu'] * 1000:>9.2f}{mbps:>8.1f} | "
+                  f"{r['sse_bytes']:>11}{sse_raw / r['sse_bytes']:>7.2f}"
+                  f"{r['sse_cpu'] * 1000:>9.2f}{r['sse_cpu'] / len(frames) * 1e6:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
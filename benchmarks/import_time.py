@@ -0,0 +1,81 @@
+"""
+Cold-start import budget for the proxy app.
+
+Runs `python -X importtime -c "import core.app"` in fresh interpreters, reports
+the median cumulative import time and the slowest modules, and exits non-zero
+when the median exceeds the budget or importing leaves files behind.
+
+    python benchmarks/import_time.py [--runs 5] [--budget-ms 800] [--top 15]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET = "core.app"
+
+
+def measure_once(cwd: str) -> Tuple[int, Dict[str, Tuple[int, int]]]:
+    """Import the app in a fresh interpreter; returns (total_us, {module: (self_us, cumulative_us)})."""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {TARGET}"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"importing {TARGET} failed")
+
+    modules: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue  # header line
+    return modules[TARGET][1], modules
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "800")))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    totals = []
+    last_modules: Dict[str, Tuple[int, int]] = {}
+    leftovers: List[str] = []
+    for _ in range(args.runs):
+        # Import from an empty directory: importing must not create logs/ or other files
+        with tempfile.TemporaryDirectory() as cwd:
+            total_us, last_modules = measure_once(cwd)
+            leftovers = os.listdir(cwd) or leftovers
+        totals.append(total_us)
+
+    median_ms = statistics.median(totals) / 1000
+    print(f"import {TARGET}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f}), budget {args.budget_ms:.0f} ms")
+
+    print("\nslowest modules by self time (last run):")
+    for name, (self_us, cumulative_us) in sorted(last_modules.items(), key=lambda kv: kv[1][0], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {name}")
+
+    ok = True
+    if leftovers:
+        print(f"\nFAIL: importing {TARGET} created files: {', '.join(sorted(leftovers))}")
+        ok = False
+    if median_ms > args.budget_ms:
+        print(f"\nFAIL: median import time {median_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Per-event cost of StreamAggregator on realistic stream mixes.
+
+Mixes:
+- chat_text:      chat-completion content deltas, finish chunk, usage chunk
+- chat_tools:     three parallel tool calls with interleaved argument fragments
+- responses_mix:  Responses API stream with a reasoning summary, output text,
+                  two function calls and `response.completed` usage
+
+Each mix is run at several lengths; flat us/event across lengths shows the
+work per event stays constant as streams grow.
+
+    python benchmarks/stream_aggregator.py [--runs 5] [--sizes 1000,10000,100000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers.stream_aggregator import StreamAggregator  # noqa: E402
+
+WORDS = "the a to of and def return self import value result stream tool file path line".split()
+
+
+def _piece(rng: random.Random) -> str:
+    return " " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+
+
+def chat_text(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    events = [{"id": "c1", "object": "chat.completion.chunk",
+               "choices": [{"index": 0, "delta": {"content": _piece(rng)}, "finish_reason": None}]}
+              for _ in range(n - 2)]
+    events.append({"id": "c1", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    events.append({"id": "c1", "choices": [], "usage": {"prompt_tokens": 900, "completion_tokens": n, "total_tokens": 900 + n}})
+    return events
+
+
+def chat_tools(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    events = []
+    for idx in range(3):
+        events.append({"id": "c1", "choices": [{"index": 0, "finish_reason": None, "delta": {"tool_calls": [
+            {"index": idx, "id": f"call_{idx}", "type": "function", "function": {"name": "edit_file", "arguments": ""}}]}}]})
+    while len(events) < n - 1:
+        idx = rng.randrange(3)
+        events.append({"id": "c1", "choices": [{"index": 0, "finish_reason": None, "delta": {"tool_calls": [
+            {"index": idx, "function": {"arguments": json.dumps(_piece(rng))[1:-1]}}]}}]})
+    events.append({"id": "c1", "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}],
+                   "usage": {"prompt_tokens": 900, "completion_tokens": n, "total_tokens": 900 + n}})
+    return events
+
+
+def responses_mix(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    body = max(1, (n - 16) // 4)  # summary, text and two argument streams share the rest
+    events: List[Dict[str, Any]] = [
+        {"type": "response.created", "response": {"id": "resp_1", "status": "in_progress"}},
+        {"type": "response.output_item.added", "output_index": 0, "item": {"type": "reasoning", "id": "rs_1"}},
+    ]
+    for part in range(2):
+        events += [{"type": "response.reasoning_summary_text.delta", "item_id": "rs_1", "output_index": 0,
+                    "summary_index": part, "delta": _piece(rng)} for _ in range(body // 2)]
+    events.append({"type": "response.output_item.added", "output_index": 1, "item": {"type": "message", "id": "msg_1"}})
+    events += [{"type": "response.output_text.delta", "item_id": "msg_1", "output_index": 1,
+                "content_index": 0, "delta": _piece(rng)} for _ in range(body)]
+    for out_idx in (2, 3):
+        item = {"type": "function_call", "id": f"fc_{out_idx}", "call_id": f"call_{out_idx}", "name": "run", "arguments": ""}
+        events.append({"type": "response.output_item.added", "output_index": out_idx, "item": item})
+        parts = [json.dumps(_piece(rng))[1:-1] for _ in range(body)]
+        events += [{"type": "response.function_call_arguments.delta", "item_id": item["id"],
+                    "output_index": out_idx, "delta": p} for p in parts]
+        events.append({"type": "response.function_call_arguments.done", "item_id": item["id"],
+                       "output_index": out_idx, "arguments": "".join(parts)})
+        events.append({"type": "response.output_item.done", "output_index": out_idx,
+                       "item": dict(item, arguments="".join(parts), status="completed")})
+    events.append({"type": "response.completed", "response": {
+        "id": "resp_1", "status": "completed",
+        "usage": {"input_tokens": 900, "output_tokens": n, "total_tokens": 900 + n,
+                  "output_tokens_details": {"reasoning_tokens": body}}}})
+    return events
+
+
+MIXES: Dict[str, Callable[[int, random.Random], List[Dict[str, Any]]]] = {
+    "chat_text": chat_text,
+    "chat_tools": chat_tools,
+    "responses_mix": responses_mix,
+}
+
+
+def run_feed(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    aggregator = StreamAggregator()
+    for obj in events:
+        aggregator.feed(obj)
+    return aggregator.result()
+
+
+def run_parse_and_feed(lines: List[str]) -> Dict[str, Any]:
+    aggregator = StreamAggregator()
+    for line in lines:
+        aggregator.feed(json.loads(line))
+    return aggregator.result()
+
+
+def _median_seconds(fn: Callable[[], Any], runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    args = parser.parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    print(f"{'mix':<15}{'events':>9} | {'feed us/ev':>11}{'events/s':>12} | {'parse+feed us/ev':>17} | result")
+    for name, build in MIXES.items():
+        for size in sizes:
+            events = build(size, random.Random(size))
+            lines = [json.dumps(e) for e in events]
+            feed_s = _median_seconds(lambda: run_feed(events), args.runs)
+            full_s = _median_seconds(lambda: run_parse_and_feed(lines), args.runs)
+            record = run_feed(events)
+            summary = (f"text={len(record['text'])} tool_calls={len(record['tool_calls'])} "
+                       f"reasoning={len(record['reasoning_summary'] or '')} usage={'yes' if record['usage'] else 'no'}")
+            print(f"{name:<15}{len(events):>9} | {feed_s / len(events) * 1e6:>11.2f}{len(events) / feed_s:>12.0f} | "
+                  f"{full_s / len(events) * 1e6:>17.2f} | {summary}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import sys
+import json
+import time
+import asyncio
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from core.lifecycle import inflight
+from utils.auth import require_admin
+from utils.diagnostics import DIAGNOSTICS_ENABLED, loop_lag, stage_stats, inflight_snapshot
+from utils.circuit_breaker import breakers
+from utils.usage_tracker import usage_tracker, GROUP_FIELDS
+from utils.logging_utils import log_event
+from utils.log_stream import log_broadcaster, LogFilter
+
+
+admin_router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+# Seconds between SSE keepalive comments on idle log streams
+LOG_STREAM_KEEPALIVE = 15.0
+
+
+@admin_router.get("/diagnostics")
+async def diagnostics():
+    """Event-loop lag, in-flight requests and cumulative stage timings."""
+    profiler_module = sys.modules.get("utils.profiler")  # only loaded once a profile was started
+    return JSONResponse(content={
+        "enabled": DIAGNOSTICS_ENABLED,
+        "draining": inflight.draining,
+        **inflight.snapshot(),
+        "loop_lag": loop_lag.snapshot(),
+        "inflight": inflight_snapshot(),
+        "stages": stage_stats.snapshot(),
+        "profiler_running": bool(profiler_module and profiler_module.profiler.running),
+        "log_stream_subscribers": len(log_broadcaster.subscribers),
+        "log_stream_ring_bytes": log_broadcaster.buffered_bytes,
+    })
+
+
+@admin_router.get("/circuit-breakers")
+async def circuit_breakers():
+    """State, error rate and rejection counters of every upstream breaker."""
+    return JSONResponse(content=breakers.snapshot())
+
+
+@admin_router.get("/usage")
+async def usage(
+    group_by: str = Query("key,model,endpoint"),
+    hours: Optional[int] = Query(None, gt=0),
+    key: Optional[str] = None,
+    model: Optional[str] = None,
+    endpoint: Optional[str] = None,
+):
+    """Token and cost rollups grouped by any of hour, key, model, endpoint."""
+    fields = [f.strip() for f in group_by.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in GROUP_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by fields: {', '.join(unknown)}")
+    since = int(time.time()) // 3600 * 3600 - (hours - 1) * 3600 if hours else None
+    rows = usage_tracker.query(fields, since=since, key=key, model=model, endpoint=endpoint)
+    return JSONResponse(content={"group_by": fields, "since": since, "rows": rows})
+
+
+@admin_router.post("/profile/start")
+async def profile_start(
+    seconds: float = Query(30.0, gt=0, le=300),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    """Start sampling the event-loop thread; it stops by itself after `seconds`."""
+    from utils.profiler import profiler
+
+    try:
+        profiler.start(seconds, interval_ms / 1000.0, threading.get_ident())
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    log_event("profiler", {"action": "start", "seconds": seconds, "interval_ms": interval_ms})
+    return JSONResponse(content={"ok": True, "seconds": seconds, "interval_ms": interval_ms})
+
+
+@admin_router.post("/profile/stop")
+async def profile_stop():
+    """Stop the profiler and return collapsed stacks for flamegraph tools."""
+    from utils.profiler import profiler
+
+    output = await asyncio.to_thread(profiler.stop)
+    log_event("profiler", {"action": "stop", "samples": profiler.samples})
+    return PlainTextResponse(content=output + "\n" if output else "")
+
+
+@admin_router.get("/logs/stream")
+async def logs_stream(
+    event: Optional[str] = Query(None, description="Comma-separated event types"),
+    model: Optional[str] = None,
+    has_tool_calls: Optional[bool] = None,
+    request_id: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated dotted paths, e.g. event,data.usage"),
+):
+    """Live `log_event` emissions as SSE, filtered and projected server-side."""
+    log_filter = LogFilter(
+        events={e.strip() for e in event.split(",") if e.strip()} if event else None,
+        model=model,
+        has_tool_calls=has_tool_calls,
+        request_id=request_id,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+    )
+    try:
+        subscriber = log_broadcaster.subscribe(log_filter)
+    except RuntimeError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    async def stream():
+        try:
+            yield ": subscribed\n\n"
+            idle_since = time.monotonic()
+            # Stop on drain so a tail session never holds up a reload
+            while not inflight.draining:
+                await subscriber.wait(1.0)
+                events, dropped = log_broadcaster.read(subscriber)
+                if dropped:
+                    yield f"event: dropped\ndata: {json.dumps({'dropped': dropped, 'total_dropped': subscriber.dropped})}\n\n"
+                for item in events:
+                    yield f"data: {json.dumps(item, ensure_ascii=False, default=str)}\n\n"
+                if events or dropped:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= LOG_STREAM_KEEPALIVE:
+                    idle_since = time.monotonic()
+                    yield ": keepalive\n\n"
+        finally:
+            log_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
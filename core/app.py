@@ -1,12 +1,33 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from core.config import config
+from core.config import get_config
 from core.routes import router
+from core.admin_routes import admin_router
+from core.lifecycle import InflightMiddleware
+from core.compression import CompressionMiddleware
+from utils.diagnostics import DIAGNOSTICS_ENABLED, loop_lag
+from utils.usage_tracker import usage_tracker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background monitors on startup and stop them on shutdown."""
+    # Parse, validate and log configuration now rather than at import time
+    get_config()
+    if DIAGNOSTICS_ENABLED:
+        loop_lag.start()
+    usage_tracker.start()
+    yield
+    await loop_lag.stop()
+    await usage_tracker.stop()
+
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
-    app = FastAPI(title="Cursor Proxy", version="1.0.0")
+    app = FastAPI(title="Cursor Proxy", version="1.0.0", lifespan=lifespan)
     
     app.add_middleware(
         CORSMiddleware,
@@ -15,9 +36,14 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Count in-flight requests/streams for graceful draining
+    app.add_middleware(InflightMiddleware)
+    # Negotiated gzip/br/zstd toward the client (SSE flushed per chunk)
+    app.add_middleware(CompressionMiddleware)
     
     # Include API routes
     app.include_router(router)
+    app.include_router(admin_router)
     
     return app
 
@@ -0,0 +1,239 @@
+"""
+Negotiated response compression (gzip, and brotli / zstd when installed).
+
+Streaming responses are flushed after every chunk so SSE frames reach the
+client as soon as they are written, at the cost of a few bytes per flush.
+"""
+import zlib
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from core.config import config
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard  # optional: pip install zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson")
+
+
+# ---- Codecs ----
+
+class GzipCodec:
+    name = "gzip"
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = config.gzip_level if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # 16 + 15: gzip container
+        return c.compress(data) + c.flush()
+
+    def encoder(self) -> "GzipEncoder":
+        return GzipEncoder(self.level)
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+class BrotliCodec:
+    name = "br"
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = config.brotli_quality if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return brotli.compress(data, quality=self.level)
+
+    def encoder(self) -> "BrotliEncoder":
+        return BrotliEncoder(self.level)
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        self._c = brotli.Compressor(quality=level)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class ZstdCodec:
+    name = "zstd"
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = config.zstd_level if level is None else level
+        self._cctx = zstandard.ZstdCompressor(level=self.level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._cctx.compress(data)
+
+    def encoder(self) -> "ZstdEncoder":
+        return ZstdEncoder(self.level)
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+CODEC_CLASSES = {"gzip": GzipCodec}
+if brotli is not None:
+    CODEC_CLASSES["br"] = BrotliCodec
+if zstandard is not None:
+    CODEC_CLASSES["zstd"] = ZstdCodec
+
+
+def available_codecs(preference: Optional[List[str]] = None) -> Dict[str, object]:
+    """Codecs in server preference order (default COMPRESSION_CODECS), skipping unknown or uninstalled ones."""
+    if preference is None:
+        preference = config.compression_codecs
+    return {name: CODEC_CLASSES[name]() for name in preference if name in CODEC_CLASSES}
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """Map of coding -> q-value from an Accept-Encoding header."""
+    accepted: Dict[str, float] = {}
+    for item in value.split(","):
+        parts = item.strip().split(";")
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, val = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(accept_encoding: str, codecs: Dict[str, object]):
+    """Pick the codec with the highest client q-value; ties go to server preference."""
+    accepted = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for name, codec in codecs.items():
+        q = accepted.get(name, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = codec, q
+    return best
+
+
+def is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+
+# ---- Middleware ----
+
+class CompressionMiddleware:
+    """Pure ASGI middleware encoding responses with the negotiated codec.
+
+    SSE and other responses without Content-Length are encoded incrementally
+    and flushed after each chunk; their headers go out as soon as the app sends
+    them. Sized responses are held until the first body message so bodies under
+    `min_bytes` can be left uncompressed.
+    """
+
+    def __init__(self, app, min_bytes: Optional[int] = None):
+        self.app = app
+        self.enabled = config.compression_enabled
+        self.min_bytes = config.compression_min_bytes if min_bytes is None else min_bytes
+        self.codecs = available_codecs()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        codec = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.codecs)
+        if codec is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[dict] = None
+        encoder = None
+        passthrough = False
+
+        def start_encoding(headers: MutableHeaders):
+            headers["Content-Encoding"] = codec.name
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            return codec.encoder()
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if not is_compressible(headers):
+                    passthrough = True
+                    await send(message)
+                elif "content-length" not in headers or headers.get("content-type", "").startswith("text/event-stream"):
+                    # Streamed body: encode from the first chunk, don't delay the headers
+                    encoder = start_encoding(headers)
+                    await send(message)
+                else:
+                    start_message = message  # held until the first body message decides the encoding
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not more_body and len(body) < self.min_bytes:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                if not more_body:
+                    data = codec.compress(body)
+                    headers["Content-Encoding"] = codec.name
+                    headers.add_vary_header("Accept-Encoding")
+                    headers["Content-Length"] = str(len(data))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                encoder = start_encoding(headers)
+                await send(start_message)
+
+            data = encoder.chunk(body) if body else b""
+            if not more_body:
+                data += encoder.finish()
+            elif not data:
+                return
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,8 +1,10 @@
 import os
-from typing import Dict
+from typing import Dict, List, Mapping, Optional
 
 try:
     from dotenv import load_dotenv
+    # Only reads .env into os.environ; a few modules (retry, server) still read their
+    # settings from the environment at import time, so this has to happen first.
     load_dotenv()  # Load .env file if it exists
 except ImportError:
     pass  # dotenv not installed, use only environment variables
@@ -11,42 +13,135 @@ from utils.logging_utils import log_event
 
 
 class ProxyConfig:
-    """Configuration class for Cursor Proxy application."""
-    
-    def __init__(self):
+    """Configuration class for Cursor Proxy application.
+
+    Construction only parses and validates `env`; problems are collected in
+    `errors`/`warnings` and reported by `log_summary()`.
+    """
+
+    def __init__(self, env: Optional[Mapping[str, str]] = None):
+        env = os.environ if env is None else env
+        self.errors: List[Dict[str, str]] = []
+        self.warnings: List[str] = []
+
         # Base URLs and keys
-        self.openai_base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com")
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        
+        self.openai_base_url = env.get("OPENAI_BASE_URL", "https://api.openai.com")
+        self.openai_api_key = env.get("OPENAI_API_KEY")
+
+        # Token for /admin endpoints (local-only access when unset)
+        self.admin_token = env.get("ADMIN_TOKEN")
+
         # Models - fixed to gpt-5 only
         self.default_model = "gpt-5"
-        
-        # Validate and set max_log_text
-        try:
-            self.max_log_text = int(os.getenv("MAX_LOG_TEXT", "2000000"))
-            if self.max_log_text <= 0:
-                raise ValueError("MAX_LOG_TEXT must be positive")
-        except ValueError as e:
-            log_event("config_error", {"field": "MAX_LOG_TEXT", "error": str(e)})
-            self.max_log_text = 2000000  # fallback
-        
+
+        self.max_log_text = self._number(env, "MAX_LOG_TEXT", int, 2000000)
+
+        # Streaming buffer: byte cap per stream and what to do with stalled clients
+        self.stream_buffer_bytes = self._number(env, "STREAM_BUFFER_BYTES", int, 1048576)
+        self.stream_slow_client_policy = env.get("STREAM_SLOW_CLIENT_POLICY", "pause").strip().lower()
+        if self.stream_slow_client_policy not in ("pause", "coalesce", "abort"):
+            self.errors.append({"field": "STREAM_SLOW_CLIENT_POLICY", "error": "Must be one of: pause, coalesce, abort"})
+            self.stream_slow_client_policy = "pause"  # fallback
+        self.stream_stall_timeout = self._number(env, "STREAM_STALL_TIMEOUT", float, 30.0)
+
+        # Content delta coalescing: 0 ms window disables it
+        self.stream_coalesce_ms = self._number(env, "STREAM_COALESCE_MS", int, 0, allow_zero=True)
+        self.stream_coalesce_bytes = self._number(env, "STREAM_COALESCE_BYTES", int, 256)
+
+        # Response compression (core/compression.py)
+        self.compression_enabled = self._flag(env, "COMPRESSION_ENABLED", True)
+        self.compression_codecs = [c.strip().lower() for c in env.get("COMPRESSION_CODECS", "zstd,br,gzip").split(",") if c.strip()]
+        self.compression_min_bytes = self._number(env, "COMPRESSION_MIN_BYTES", int, 1024, allow_zero=True)
+        self.gzip_level = self._number(env, "GZIP_LEVEL", int, 6, allow_zero=True)
+        self.brotli_quality = self._number(env, "BROTLI_QUALITY", int, 4, allow_zero=True)
+        self.zstd_level = self._number(env, "ZSTD_LEVEL", int, 3)
+
+        # Circuit breaker and fallback route (utils/circuit_breaker.py); 0 ms latency disables `slow`
+        self.cb_enabled = self._flag(env, "CB_ENABLED", True)
+        self.cb_window_seconds = self._number(env, "CB_WINDOW_SECONDS", float, 60.0)
+        self.cb_min_requests = self._number(env, "CB_MIN_REQUESTS", int, 10)
+        self.cb_error_rate = self._number(env, "CB_ERROR_RATE", float, 0.5)
+        self.cb_latency_ms = self._number(env, "CB_LATENCY_MS", float, 0.0, allow_zero=True)
+        self.cb_open_seconds = self._number(env, "CB_OPEN_SECONDS", float, 30.0)
+        self.fallback_base_url = env.get("FALLBACK_BASE_URL", "").rstrip("/")
+        self.fallback_model = env.get("FALLBACK_MODEL", "")
+        self.fallback_api_key = env.get("FALLBACK_API_KEY", "")
+
+        # Usage rollups (utils/usage_tracker.py)
+        self.usage_rollup_path = env.get("USAGE_ROLLUP_PATH", "logs/usage_rollups.json")
+        self.usage_flush_seconds = self._number(env, "USAGE_FLUSH_SECONDS", float, 60.0)
+        self.usage_retention_hours = self._number(env, "USAGE_RETENTION_HOURS", int, 720)
+
+        # Live log stream (utils/log_stream.py)
+        self.log_stream_ring_size = self._number(env, "LOG_STREAM_RING_SIZE", int, 1000)
+        self.log_stream_ring_bytes = self._number(env, "LOG_STREAM_RING_BYTES", int, 8 * 1024 * 1024)
+        self.log_stream_max_subscribers = self._number(env, "LOG_STREAM_MAX_SUBSCRIBERS", int, 4)
+
+        # Event-loop lag sampling (utils/diagnostics.py)
+        self.loop_lag_interval = self._number(env, "LOOP_LAG_INTERVAL", float, 0.5)
+
         # Validate base URL
         if not self.openai_base_url.startswith(("http://", "https://")):
-            log_event("config_error", {"field": "OPENAI_BASE_URL", "error": "Invalid URL format"})
+            self.errors.append({"field": "OPENAI_BASE_URL", "error": "Invalid URL format"})
             self.openai_base_url = "https://api.openai.com"  # fallback
-        
+
         # Warning if no API key is provided
         if not self.openai_api_key:
-            log_event("config_warning", {"message": "No OPENAI_API_KEY provided - will require key in requests"})
-        
-        # Log startup configuration
+            self.warnings.append("No OPENAI_API_KEY provided - will require key in requests")
+
+    def _number(self, env: Mapping[str, str], field: str, cast, default, allow_zero: bool = False):
+        """Parse a positive (or non-negative) number, falling back to `default`."""
+        try:
+            value = cast(env.get(field, str(default)))
+            if value < 0 or (value == 0 and not allow_zero):
+                raise ValueError(f"{field} must be {'non-negative' if allow_zero else 'positive'}")
+            return value
+        except ValueError as e:
+            self.errors.append({"field": field, "error": str(e)})
+            return default  # fallback
+
+    def _flag(self, env: Mapping[str, str], field: str, default: bool) -> bool:
+        """Parse an on/off switch; anything but 1/true/yes/on is off."""
+        return env.get(field, "true" if default else "false").strip().lower() in ("1", "true", "yes", "on")
+
+    def log_summary(self) -> None:
+        """Log validation problems and the effective startup configuration."""
+        for error in self.errors:
+            log_event("config_error", error)
+        for message in self.warnings:
+            log_event("config_warning", {"message": message})
+
         log_event("startup", {
             "DEFAULT_MODEL": self.default_model,
             "OPENAI_BASE_URL": self.openai_base_url,
             "HAS_API_KEY": bool(self.openai_api_key),
-            "MAX_LOG_TEXT": self.max_log_text
+            "MAX_LOG_TEXT": self.max_log_text,
+            "STREAM_BUFFER_BYTES": self.stream_buffer_bytes,
+            "STREAM_SLOW_CLIENT_POLICY": self.stream_slow_client_policy,
+            "STREAM_COALESCE_MS": self.stream_coalesce_ms,
+            "COMPRESSION_ENABLED": self.compression_enabled,
+            "CB_ENABLED": self.cb_enabled,
         })
 
 
-# Global config instance
-config = ProxyConfig()
\ No newline at end of file
+_config: Optional[ProxyConfig] = None
+
+
+def get_config() -> ProxyConfig:
+    """Build (once) and return the global configuration."""
+    global _config
+    if _config is None:
+        _config = ProxyConfig()
+        _config.log_summary()
+    return _config
+
+
+class _LazyConfig:
+    """Attribute proxy so `from core.config import config` does not build config at import."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_config(), name)
+
+
+# Global config instance (built on first use, or explicitly at app startup)
+config = _LazyConfig()
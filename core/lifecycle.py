@@ -0,0 +1,51 @@
+"""
+In-flight request accounting used for graceful draining.
+"""
+from typing import Dict
+
+
+class InflightCounter:
+    """Counts HTTP requests (and SSE streams among them) currently being served."""
+
+    def __init__(self):
+        self.requests = 0
+        self.streams = 0
+        self.draining = False
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"inflight_requests": self.requests, "inflight_streams": self.streams}
+
+
+inflight = InflightCounter()
+
+
+class InflightMiddleware:
+    """Pure ASGI middleware so streaming responses are counted until their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        is_stream = False
+
+        async def send_wrapper(message):
+            nonlocal is_stream
+            if message["type"] == "http.response.start" and not is_stream:
+                for name, value in message.get("headers", []):
+                    if name == b"content-type" and value.startswith(b"text/event-stream"):
+                        is_stream = True
+                        inflight.streams += 1
+                        break
+            await send(message)
+
+        inflight.requests += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            inflight.requests -= 1
+            if is_stream:
+                inflight.streams -= 1
@@ -1,13 +1,16 @@
+import time
 from typing import Optional
 
-from fastapi import APIRouter, Request, Header
+from fastapi import APIRouter, Request, Header, HTTPException
 from fastapi.responses import JSONResponse, StreamingResponse
 
 from core.config import config
 from utils.auth import resolve_auth
-from utils.models import sanitize_payload
+from utils.models import sanitize_payload, ensure_stream_usage
 from handlers.proxy_client import proxy_stream, proxy_json
 from utils.logging_utils import log_event
+from utils.diagnostics import track_request
+from utils.circuit_breaker import route_request
 
 
 router = APIRouter()
@@ -15,6 +18,7 @@ router = APIRouter()
 
 async def _handle_proxy_request(req: Request, authorization: Optional[str], endpoint: str):
     """Common logic for handling proxy requests."""
+    started = time.monotonic()
     body = await req.json()
     auth = resolve_auth(req, authorization, body)
     body = sanitize_payload(body)
@@ -36,13 +40,28 @@ async def _handle_proxy_request(req: Request, authorization: Optional[str], endp
         "full_payload": body,  # Log complete request payload
     })
 
+    # Ask for usage on chat-completion streams; hide the extra chunk if the client didn't.
+    # Done after logging so `full_payload` shows what the client actually sent.
+    strip_usage_chunk = False
+    if body.get("stream") and endpoint == "/v1/chat/completions":
+        strip_usage_chunk = ensure_stream_usage(body)
+
     headers = {"Authorization": auth, "Content-Type": "application/json"}
     url = f"{config.openai_base_url}{endpoint}"
+    trace = track_request(endpoint, body.get("model"), bool(body.get("stream")), started=started)
 
     if body.get("stream"):
-        return StreamingResponse(proxy_stream(url, headers, body), media_type="text/event-stream")
-    data = await proxy_json(url, headers, body)
-    return JSONResponse(content=data)
+        # Pick the route before the stream starts so a fail-fast 503 reaches the client
+        try:
+            route = route_request(url, headers, body)
+        except HTTPException:
+            trace.finish()
+            raise
+        return StreamingResponse(
+            proxy_stream(url, headers, body, trace, strip_usage_chunk=strip_usage_chunk, route=route, endpoint=endpoint),
+            media_type="text/event-stream",
+        )
+    return await proxy_json(url, headers, body, trace, endpoint=endpoint)
 
 
 @router.post("/v1/chat/completions")
@@ -0,0 +1,216 @@
+"""
+Production entry point with zero-downtime reload and graceful draining.
+
+The supervisor binds the listening socket once and runs uvicorn workers on it:
+
+    python -m core.server
+
+- SIGHUP: start a fresh worker set on the same socket, wait until it is ready,
+  then drain the old workers (they stop accepting and finish active streams).
+- SIGTERM / SIGINT: drain all workers and exit.
+
+Workers log `drain_started`, periodic `drain_progress` with in-flight counts
+and `drain_complete` while shutting down.
+"""
+import os
+import sys
+import time
+import signal
+import select
+import socket
+import asyncio
+import logging
+import subprocess
+from typing import List, Optional
+
+import uvicorn
+
+from core.lifecycle import inflight
+from utils.logging_utils import log_event
+
+# Configuration from environment
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8787"))
+WORKERS = int(os.getenv("WORKERS", "1"))
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "60"))
+DRAIN_REPORT_SECONDS = float(os.getenv("DRAIN_REPORT_SECONDS", "1"))
+WORKER_READY_TIMEOUT = float(os.getenv("WORKER_READY_TIMEOUT", "30"))
+
+
+# ---- Worker ----
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that reports readiness and in-flight counts while draining."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: Optional[int] = None):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def serve(self, sockets=None):
+        # SIGHUP drains the worker just like SIGTERM
+        signal.signal(signal.SIGHUP, self.handle_exit)
+        await super().serve(sockets=sockets)
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if self.ready_fd is not None and not self.should_exit:
+            os.write(self.ready_fd, b"1")
+            os.close(self.ready_fd)
+            self.ready_fd = None
+
+    async def shutdown(self, sockets=None):
+        inflight.draining = True
+        started = time.monotonic()
+        log_event("drain_started", {
+            "pid": os.getpid(),
+            "deadline_seconds": self.config.timeout_graceful_shutdown,
+            "connections": len(self.server_state.connections),
+            **inflight.snapshot(),
+        })
+
+        async def report():
+            while True:
+                await asyncio.sleep(DRAIN_REPORT_SECONDS)
+                log_event("drain_progress", {
+                    "pid": os.getpid(),
+                    "elapsed_ms": int((time.monotonic() - started) * 1000),
+                    "connections": len(self.server_state.connections),
+                    **inflight.snapshot(),
+                })
+
+        reporter = asyncio.create_task(report())
+        try:
+            await super().shutdown(sockets=sockets)
+        finally:
+            reporter.cancel()
+
+        log_event("drain_complete", {
+            "pid": os.getpid(),
+            "duration_ms": int((time.monotonic() - started) * 1000),
+            **inflight.snapshot(),
+        })
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+
+
+def run_worker(fd: int, ready_fd: int) -> None:
+    """Serve the app on an inherited listening socket."""
+    sock = socket.socket(fileno=fd)
+    config = uvicorn.Config(
+        "core.app:app",
+        log_level="warning",
+        timeout_graceful_shutdown=DRAIN_TIMEOUT,
+    )
+    DrainingServer(config, ready_fd).run(sockets=[sock])
+
+
+# ---- Supervisor ----
+
+def _spawn_worker(sock: socket.socket) -> Optional[subprocess.Popen]:
+    """Start one worker and wait until it has finished application startup."""
+    ready_r, ready_w = os.pipe()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "core.server", "--worker", str(sock.fileno()), str(ready_w)],
+        pass_fds=(sock.fileno(), ready_w),
+    )
+    os.close(ready_w)
+    try:
+        readable, _, _ = select.select([ready_r], [], [], WORKER_READY_TIMEOUT)
+        ready = bool(readable) and os.read(ready_r, 1) == b"1"
+    finally:
+        os.close(ready_r)
+    if not ready:
+        proc.kill()
+        proc.wait()
+        return None
+    return proc
+
+
+def _spawn_worker_set(sock: socket.socket, count: int) -> Optional[List[subprocess.Popen]]:
+    workers = []
+    for _ in range(count):
+        proc = _spawn_worker(sock)
+        if proc is None:
+            for w in workers:
+                w.terminate()
+            return None
+        workers.append(proc)
+    return workers
+
+
+def _terminate(workers: List[subprocess.Popen]) -> None:
+    for w in workers:
+        if w.poll() is None:
+            w.send_signal(signal.SIGTERM)
+
+
+def supervise() -> None:
+    """Own the listening socket and manage worker generations."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    pending: List[int] = []
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, lambda s, f: pending.append(s))
+
+    workers = _spawn_worker_set(sock, WORKERS)
+    if workers is None:
+        log_event("supervisor", {"action": "start_failed", "host": HOST, "port": PORT})
+        sys.exit(1)
+    draining: List[subprocess.Popen] = []
+    log_event("supervisor", {
+        "action": "started", "pid": os.getpid(), "host": HOST, "port": PORT,
+        "workers": [w.pid for w in workers],
+    })
+
+    while True:
+        while pending:
+            sig = pending.pop(0)
+            if sig == signal.SIGHUP:
+                new_workers = _spawn_worker_set(sock, WORKERS)
+                if new_workers is None:
+                    log_event("supervisor", {"action": "reload_failed", "workers": [w.pid for w in workers]})
+                    continue
+                _terminate(workers)
+                draining.extend(workers)
+                log_event("supervisor", {
+                    "action": "reloaded",
+                    "workers": [w.pid for w in new_workers],
+                    "draining": [w.pid for w in draining],
+                })
+                workers = new_workers
+            else:
+                log_event("supervisor", {"action": "stopping", "signal": signal.Signals(sig).name})
+                _terminate(workers + draining)
+                deadline = time.monotonic() + DRAIN_TIMEOUT + 5
+                for w in workers + draining:
+                    try:
+                        w.wait(timeout=max(0.0, deadline - time.monotonic()))
+                    except subprocess.TimeoutExpired:
+                        w.kill()
+                sock.close()
+                log_event("supervisor", {"action": "stopped"})
+                return
+
+        # Reap drained workers; replace current ones that died unexpectedly
+        for w in [w for w in draining if w.poll() is not None]:
+            draining.remove(w)
+            log_event("supervisor", {"action": "worker_drained", "pid": w.pid, "returncode": w.returncode})
+        for i, w in enumerate(workers):
+            if w.poll() is not None:
+                log_event("supervisor", {"action": "worker_died", "pid": w.pid, "returncode": w.returncode})
+                replacement = _spawn_worker(sock)
+                if replacement is not None:
+                    workers[i] = replacement
+
+        time.sleep(0.2)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        run_worker(int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        supervise()
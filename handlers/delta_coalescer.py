@@ -0,0 +1,172 @@
+"""
+Coalescing of consecutive chat-completion content deltas into fewer SSE events.
+"""
+import json
+import time
+import asyncio
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+
+
+def is_plain_content_delta(obj: Dict[str, Any]) -> bool:
+    """True for chunks that only carry `choices[0].delta.content` text.
+
+    Tool-call deltas, role/refusal deltas, finish and usage chunks are not
+    plain content and must be forwarded unchanged.
+    """
+    if obj.get("usage"):
+        return False
+    choices = obj.get("choices")
+    if not isinstance(choices, list) or len(choices) != 1:
+        return False
+    ch0 = choices[0]
+    if not isinstance(ch0, dict) or ch0.get("finish_reason") is not None or ch0.get("logprobs") is not None:
+        return False
+    delta = ch0.get("delta")
+    if not isinstance(delta, dict) or not isinstance(delta.get("content"), str):
+        return False
+    for key, value in delta.items():
+        if key != "content" and value is not None:
+            return False
+    return True
+
+
+class DeltaCoalescer:
+    """Merge consecutive content deltas within a time window or byte threshold.
+
+    `add()` holds a content chunk back; `flush()` returns one SSE line with the
+    concatenated content, built on the first held chunk so ids and metadata
+    stay intact. A single held chunk is forwarded as its original raw line.
+    """
+
+    def __init__(self, window_ms: int, max_bytes: int):
+        self.window = window_ms / 1000.0
+        self.max_bytes = max_bytes
+
+        self._first_obj: Optional[Dict[str, Any]] = None
+        self._first_raw: Optional[str] = None
+        self._parts: List[str] = []
+        self._arrivals: List[float] = []
+        self._pending_bytes = 0
+
+        # Stats
+        self._started = time.monotonic()
+        self.chunks_in = 0
+        self.events_out = 0
+        self.merged_events = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._parts)
+
+    def time_left(self) -> float:
+        """Seconds until the held chunks must be flushed."""
+        if not self._arrivals:
+            return self.window
+        return max(0.0, self._arrivals[0] + self.window - time.monotonic())
+
+    def accepts(self, obj: Dict[str, Any]) -> bool:
+        """Whether `obj` can be merged with the currently held chunks."""
+        if not is_plain_content_delta(obj):
+            return False
+        if self._first_obj is not None and obj.get("id") != self._first_obj.get("id"):
+            return False
+        return True
+
+    def add(self, obj: Dict[str, Any], raw_line: str) -> Optional[str]:
+        """Hold a content chunk; returns a flushed line once a threshold is hit."""
+        content = obj["choices"][0]["delta"]["content"]
+        if self._first_obj is None:
+            self._first_obj = obj
+            self._first_raw = raw_line
+        self._parts.append(content)
+        self._arrivals.append(time.monotonic())
+        self._pending_bytes += len(content)
+        self.chunks_in += 1
+
+        if self._pending_bytes >= self.max_bytes or self.time_left() <= 0:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[str]:
+        """Emit the held chunks as one SSE data line (or None if nothing is held)."""
+        if not self._parts:
+            return None
+        return self.flush_chunk()[0]
+
+    def flush_chunk(self) -> Tuple[str, Dict[str, Any]]:
+        """Like `flush()`, also returning the merged chunk (held chunks required)."""
+        if len(self._parts) == 1:
+            line = self._first_raw + "\n"
+            merged = self._first_obj
+        else:
+            merged = dict(self._first_obj)
+            ch0 = dict(merged["choices"][0])
+            ch0["delta"] = dict(ch0["delta"], content="".join(self._parts))
+            merged["choices"] = [ch0]
+            merged.pop("obfuscation", None)
+            line = "data: " + json.dumps(merged, ensure_ascii=False, separators=(",", ":")) + "\n"
+            self.merged_events += 1
+
+        now = time.monotonic()
+        for arrived in self._arrivals:
+            delay = now - arrived
+            self.latency_sum += delay
+            if delay > self.latency_max:
+                self.latency_max = delay
+        self.events_out += 1
+
+        self._first_obj = None
+        self._first_raw = None
+        self._parts = []
+        self._arrivals = []
+        self._pending_bytes = 0
+        return line, merged
+
+    def wrap_lines(self, lines: AsyncIterator[str]) -> AsyncIterator[Optional[str]]:
+        """Upstream lines interleaved with None ticks when a flush is due."""
+        return iter_lines_with_deadline(lines, self)
+
+    def stats(self) -> Dict[str, Any]:
+        """Chunks-per-second vs added-latency summary for the `response` event."""
+        elapsed = time.monotonic() - self._started
+        return {
+            "window_ms": int(self.window * 1000),
+            "max_bytes": self.max_bytes,
+            "content_chunks_in": self.chunks_in,
+            "content_events_out": self.events_out,
+            "merged_events": self.merged_events,
+            "chunks_in_per_s": round(self.chunks_in / elapsed, 1) if elapsed > 0 else None,
+            "events_out_per_s": round(self.events_out / elapsed, 1) if elapsed > 0 else None,
+            "avg_added_latency_ms": round(self.latency_sum / self.chunks_in * 1000, 2) if self.chunks_in else 0.0,
+            "max_added_latency_ms": round(self.latency_max * 1000, 2),
+        }
+
+
+async def iter_lines_with_deadline(lines: AsyncIterator[str], coalescer: DeltaCoalescer) -> AsyncIterator[Optional[str]]:
+    """Iterate upstream lines, yielding None when held chunks are due for a flush.
+
+    The pending read is kept across timeouts so the underlying stream is never
+    cancelled mid-line.
+    """
+    iterator = lines.__aiter__()
+    next_line: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if next_line is None:
+                next_line = asyncio.ensure_future(iterator.__anext__())
+            if coalescer.pending:
+                done, _ = await asyncio.wait({next_line}, timeout=coalescer.time_left())
+                if not done:
+                    yield None
+                    continue
+            try:
+                line = await next_line
+            except StopAsyncIteration:
+                return
+            next_line = None
+            yield line
+    finally:
+        if next_line is not None and not next_line.done():
+            next_line.cancel()
@@ -4,79 +4,150 @@ Refactored proxy client with modular structure.
 import time
 import json
 import asyncio
-from typing import Dict, Any, List
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit
 
 import httpx
 from fastapi import HTTPException
+from fastapi.responses import Response
 
 from core.config import config
 from utils.logging_utils import log_event, redact_headers
+from utils.diagnostics import NULL_TRACE, STATE_AWAITING_UPSTREAM, STATE_STREAMING, STATE_LOGGING
 from utils.retry_utils import should_retry_status, log_and_wait_retry, RETRY_MAX
-from parsers.response_parser import (
-    extract_text_from_streaming_chunk,
-    extract_tool_calls_from_streaming_chunk,
-    extract_finish_reason_from_chunk
-)
+from utils.circuit_breaker import breakers, route_request
+from parsers.stream_aggregator import StreamAggregator
 from parsers.response_logger import log_response_event, prepare_streaming_text_for_log
 from utils.http_utils import extract_openai_headers
+from handlers.stream_buffer import StreamBuffer, SlowClientAborted
 
 
-async def proxy_json(url: str, headers: Dict[str, str], payload: Dict[str, Any]):
-    """Proxy non-streaming requests to OpenAI API with detailed logging."""
-
-    async with httpx.AsyncClient(timeout=None) as client:
-        for attempt in range(RETRY_MAX + 1):
-            r = await client.post(url, headers=headers, json=payload)
-            openai_headers = extract_openai_headers(r)
-
-            # Handle retryable errors (429, 5xx)
-            if should_retry_status(r.status_code):
-                body_text = r.text or ""
-                if await log_and_wait_retry(r.status_code, attempt, r.headers, body_text, openai_headers["req_id"]):
-                    continue  # retry
-                # Attempts exhausted
-                log_event("error", {"status": r.status_code, "body": body_text, "openai_request_id": openai_headers["req_id"]})
-                raise HTTPException(status_code=r.status_code, detail=body_text)
-
-            if r.status_code >= 400:
-                log_event("error", {"status": r.status_code, "body": r.text, "openai_request_id": openai_headers["req_id"]})
-                raise HTTPException(status_code=r.status_code, detail=r.text)
-
-            # Success - parse and log response
-            data = r.json()
-            
-            log_response_event(
-                payload=payload,
-                response_data=data,
-                streaming=False,
-                req_id=openai_headers["req_id"],
-                processing_ms=openai_headers["processing_ms"]
-            )
-            
-            return data
-
-
-async def proxy_stream(url: str, headers: Dict[str, str], payload: Dict[str, Any]):
-    """Proxy streaming requests to OpenAI API with detailed logging."""
+async def proxy_json(url: str, headers: Dict[str, str], payload: Dict[str, Any], trace=NULL_TRACE,
+                     endpoint: Optional[str] = None):
+    """Proxy non-streaming requests to OpenAI API with detailed logging.
+
+    The upstream body is returned to the client as received; it is only parsed
+    for the `response` log event, never re-encoded. `endpoint` is the proxy
+    route (e.g. `/v1/chat/completions`) that usage is recorded under,
+    whichever upstream the request is routed to.
+    """
+    if endpoint is None:
+        endpoint = urlsplit(url).path
+
+    try:
+        trace.set_state(STATE_AWAITING_UPSTREAM)
+        async with httpx.AsyncClient(timeout=None) as client:
+            for attempt in range(RETRY_MAX + 1):
+                # Circuit breaker: primary, fallback or fail fast
+                target_url, target_headers, target_payload, upstream = route_request(url, headers, payload)
+                started = time.monotonic()
+                try:
+                    r = await client.post(target_url, headers=target_headers, json=target_payload)
+                except httpx.TransportError:
+                    breakers.record(upstream, None)
+                    raise
+                breakers.record(upstream, r.status_code, time.monotonic() - started)
+                openai_headers = extract_openai_headers(r)
+
+                # Handle retryable errors (429, 5xx)
+                if should_retry_status(r.status_code):
+                    body_text = r.text or ""
+                    if await log_and_wait_retry(r.status_code, attempt, r.headers, body_text, openai_headers["req_id"]):
+                        continue  # retry
+                    # Attempts exhausted
+                    log_event("error", {"status": r.status_code, "body": body_text, "openai_request_id": openai_headers["req_id"]})
+                    raise HTTPException(status_code=r.status_code, detail=body_text)
+
+                if r.status_code >= 400:
+                    log_event("error", {"status": r.status_code, "body": r.text, "openai_request_id": openai_headers["req_id"]})
+                    raise HTTPException(status_code=r.status_code, detail=r.text)
+
+                # Success - parse for logging, pass the raw body through
+                raw_body = r.content
+                data = json.loads(raw_body)
+
+                trace.set_state(STATE_LOGGING)
+                log_response_event(
+                    payload=target_payload,
+                    response_data=data,
+                    streaming=False,
+                    req_id=openai_headers["req_id"],
+                    processing_ms=openai_headers["processing_ms"],
+                    auth=target_headers.get("Authorization"),
+                    endpoint=endpoint
+                )
+
+                return Response(
+                    content=raw_body,
+                    media_type=r.headers.get("content-type", "application/json"),
+                )
+    finally:
+        trace.finish()
+
+
+async def proxy_stream(url: str, headers: Dict[str, str], payload: Dict[str, Any], trace=NULL_TRACE,
+                       strip_usage_chunk: bool = False, route=None, endpoint: Optional[str] = None):
+    """Proxy streaming requests to OpenAI API with detailed logging.
+
+    With `strip_usage_chunk`, the usage-only chunk requested by the proxy via
+    `stream_options.include_usage` is recorded but not forwarded to the client.
+    `route` is the `route_request()` result already chosen for the first
+    attempt (so a fail-fast 503 is raised before the response starts).
+    `endpoint` is the proxy route usage is recorded under, as in `proxy_json`.
+    """
+    if endpoint is None:
+        endpoint = urlsplit(url).path
     
-    # Accumulators for final logging
-    full_text_parts: List[str] = []
-    usage = None
-    finish_reason = None
+    # Text, tool calls, reasoning summary and usage for final logging
+    aggregator = StreamAggregator()
     current_event = None
-    tool_calls_info = []
     cancelled_by_client = False
     req_id = None
     processing_ms = None
-    # Aggregator for streaming tool_calls (OpenAI delta tool_calls)
-    tool_calls_agg: Dict[int, Dict[str, Any]] = {}
+    # Set once upstream answered with a success status and the stream started
+    upstream_ok = False
+    # Payload/headers actually sent upstream (differ when routed to a fallback)
+    routed_payload, routed_headers = payload, headers
+    # Per-stream buffer between upstream reads and client writes
+    buffer = StreamBuffer(
+        max_bytes=config.stream_buffer_bytes,
+        policy=config.stream_slow_client_policy,
+        stall_timeout=config.stream_stall_timeout,
+    )
+    # Optional merging of consecutive content deltas into fewer SSE events
+    coalescer = None
+    if config.stream_coalesce_ms > 0:
+        from handlers.delta_coalescer import DeltaCoalescer  # optional, imported on first use
+        coalescer = DeltaCoalescer(config.stream_coalesce_ms, config.stream_coalesce_bytes)
 
-    try:
+    async def flush_coalesced():
+        """Forward held content deltas before any other frame to preserve order."""
+        if coalescer is not None and coalescer.pending:
+            await buffer.put(coalescer.flush())
+
+    async def pump():
+        """Read upstream SSE lines into the buffer, aggregating data for logging."""
+        nonlocal current_event, req_id, processing_ms, routed_payload, routed_headers, upstream_ok
+
+        first_route = route
         async with httpx.AsyncClient(timeout=None) as client:
             attempt = 0
             while attempt <= RETRY_MAX:
+                # Circuit breaker: primary, fallback or fail fast
+                if first_route is not None:
+                    target_url, target_headers, target_payload, upstream = first_route
+                    first_route = None
+                else:
+                    target_url, target_headers, target_payload, upstream = route_request(url, headers, payload)
+                routed_payload, routed_headers = target_payload, target_headers
+                started = time.monotonic()
+                recorded = False
                 try:
-                    async with client.stream("POST", url, headers=headers, json=payload) as r:
+                    trace.set_state(STATE_AWAITING_UPSTREAM)
+                    async with client.stream("POST", target_url, headers=target_headers, json=target_payload) as r:
+                        breakers.record(upstream, r.status_code, time.monotonic() - started)
+                        recorded = True
+
                         # Handle retryable errors (429, 5xx) 
                         if should_retry_status(r.status_code):
                             text = await r.aread()
@@ -97,8 +168,18 @@ async def proxy_stream(url: str, headers: Dict[str, str], payload: Dict[str, Any
                         openai_headers = extract_openai_headers(r)
                         req_id = openai_headers["req_id"]
                         processing_ms = openai_headers["processing_ms"]
+                        upstream_ok = True
+                        trace.set_state(STATE_STREAMING)
 
-                        async for raw_line in r.aiter_lines():
+                        lines = r.aiter_lines()
+                        if coalescer is not None:
+                            lines = coalescer.wrap_lines(lines)
+
+                        async for raw_line in lines:
+                            if raw_line is None:
+                                # Coalescing window elapsed with no new upstream line
+                                await buffer.put(coalescer.flush())
+                                continue
                             if not raw_line:
                                 continue
                             line = raw_line.strip()
@@ -110,69 +191,49 @@ async def proxy_stream(url: str, headers: Dict[str, str], payload: Dict[str, Any
                                 current_event = line.split("event:", 1)[1].strip()
                                 continue
                             if not line.startswith("data:"):
-                                yield raw_line + "\n"
+                                await flush_coalesced()
+                                await buffer.put(raw_line + "\n")
                                 continue
 
                             data_str = line[5:].strip()  # after 'data:'
                             if data_str == "[DONE]":
                                 break
+                            if trace.active:
+                                parse_started = time.perf_counter()
 
                             # Parse JSON chunk
                             try:
                                 obj = json.loads(data_str)
                             except Exception:
-                                yield raw_line + "\n"
+                                await flush_coalesced()
+                                await buffer.put(raw_line + "\n")
                                 continue
 
-                            # Extract usage if present
-                            if usage is None and "usage" in obj:
-                                usage = obj["usage"]
-
-                            # Extract finish_reason
-                            chunk_finish_reason = extract_finish_reason_from_chunk(obj)
-                            if chunk_finish_reason:
-                                finish_reason = chunk_finish_reason
-                            
-                            # Extract tool calls from streaming chunks and aggregate by index
-                            chunk_tool_calls = extract_tool_calls_from_streaming_chunk(obj)
-                            if chunk_tool_calls:
-                                for tc in chunk_tool_calls:
-                                    idx = tc.get("index")
-                                    if idx is None:
-                                        # Fallback index if provider does not send index
-                                        idx = max(tool_calls_agg.keys(), default=-1) + 1
-                                    entry = tool_calls_agg.get(idx)
-                                    if entry is None:
-                                        entry = {
-                                            "id": tc.get("id"),
-                                            "type": tc.get("type"),
-                                            "function_name": tc.get("function_name"),
-                                            "function_args": ""
-                                        }
-                                        tool_calls_agg[idx] = entry
-                                    else:
-                                        if not entry.get("id") and tc.get("id"):
-                                            entry["id"] = tc.get("id")
-                                        if not entry.get("type") and tc.get("type"):
-                                            entry["type"] = tc.get("type")
-                                        if not entry.get("function_name") and tc.get("function_name"):
-                                            entry["function_name"] = tc.get("function_name")
-                                    args_piece = tc.get("function_args")
-                                    if isinstance(args_piece, str):
-                                        entry["function_args"] = (entry.get("function_args") or "") + args_piece
-
-                            # Extract text content
-                            piece = extract_text_from_streaming_chunk(obj, current_event)
-                            if piece:
-                                full_text_parts.append(piece)
-
-                            # Forward the chunk to client
-                            yield raw_line + "\n"
+                            # Chat chunks and Responses API events, dispatched on event type
+                            usage_only = aggregator.feed(obj, current_event)
+                            if trace.active:
+                                trace.add_time("parse", time.perf_counter() - parse_started)
+
+                            # Usage-only final chunk (include_usage)
+                            if strip_usage_chunk and usage_only:
+                                continue  # injected by the proxy, client did not ask for it
+
+                            # Forward the chunk to client, merging plain content deltas if enabled
+                            if coalescer is not None and coalescer.accepts(obj):
+                                merged_line = coalescer.add(obj, raw_line)
+                                if merged_line:
+                                    await buffer.put(merged_line)
+                                continue
+                            await flush_coalesced()
+                            await buffer.put(raw_line + "\n", obj)
                         
                         # Normal completion - exit retry loop
+                        await flush_coalesced()
                         return
                         
                 except (httpx.StreamClosed, httpx.ReadError, httpx.RemoteProtocolError) as e:
+                    if not recorded:
+                        breakers.record(upstream, None)
                     # Network errors during stream reading - retry if possible
                     if attempt < RETRY_MAX:
                         log_event("stream_error_retry", {
@@ -189,45 +250,101 @@ async def proxy_stream(url: str, headers: Dict[str, str], payload: Dict[str, Any
                             "attempt": attempt + 1
                         })
                         raise
+                except httpx.TransportError:
+                    # Connection failed before a response arrived
+                    if not recorded:
+                        breakers.record(upstream, None)
+                    raise
 
-    except asyncio.CancelledError:
-        cancelled_by_client = True
-    except (httpx.ReadError, httpx.RemoteProtocolError, httpx.ConnectError) as e:
-        cancelled_by_client = True
-        log_event("error", {"stage": "stream", "message": str(e)})
-        raise
-    finally:
-        # Final logging
-        full_text = "".join(full_text_parts)
+    logged = False
+
+    def log_final(cancelled: bool) -> None:
+        """Emit the `response` event (and usage) once, from whichever side finishes first."""
+        nonlocal logged
+        if logged:
+            return
+        logged = True
+        trace.set_state(STATE_LOGGING)
+        record = aggregator.result()
+        full_text = record["text"]
         logged_text, truncated = prepare_streaming_text_for_log(full_text)
-        
+        tool_calls_info = record["tool_calls"]
+
         # If model stopped due to length limit, mark as truncated
-        if finish_reason == "length":
+        if record["finish_reason"] in ("length", "max_output_tokens"):
             truncated = True
 
-        # Build final tool_calls list from aggregator, preserving index order
-        if tool_calls_agg:
-            tool_calls_info = []
-            for idx in sorted(tool_calls_agg.keys()):
-                e = tool_calls_agg[idx]
-                tool_calls_info.append({
-                    "id": e.get("id"),
-                    "type": e.get("type"),
-                    "function_name": e.get("function_name"),
-                    "function_args": e.get("function_args")
-                })
+        stream_stats = buffer.stats()
+        if coalescer is not None:
+            stream_stats["coalesce"] = coalescer.stats()
 
         log_response_event(
-            payload=payload,
+            payload=routed_payload,
             content_text=logged_text,
-            usage=usage,
-            finish_reason=finish_reason,
+            usage=record["usage"],
+            finish_reason=record["finish_reason"],
             has_tool_calls=bool(tool_calls_info),
             tool_calls=tool_calls_info if tool_calls_info else None,
+            reasoning_summary=record["reasoning_summary"],
+            response_id=record["response_id"],
             streaming=True,
             content_length=len(full_text),
             truncated=truncated,
             req_id=req_id,
             processing_ms=processing_ms,
-            cancelled_by_client=cancelled_by_client
+            cancelled_by_client=cancelled,
+            stream_stats=stream_stats,
+            auth=routed_headers.get("Authorization"),
+            endpoint=endpoint,
+            record_usage=upstream_ok
         )
+        trace.finish()
+
+    async def run_pump():
+        try:
+            await pump()
+        except SlowClientAborted:
+            log_event("stream_slow_client", {
+                "policy": buffer.policy,
+                "stall_timeout": buffer.stall_timeout,
+                "max_buffer_bytes": buffer.max_bytes,
+                "openai_request_id": req_id,
+            })
+            # Log now: the client side may stay blocked on a stalled write for a long time
+            log_final(cancelled=True)
+            # Make drain() raise so the connection is dropped, not ended like a complete answer
+            buffer.close(SlowClientAborted())
+        except BaseException as e:
+            buffer.close(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        else:
+            buffer.close()
+
+    pump_task = asyncio.create_task(run_pump())
+
+    try:
+        async for chunk in buffer.drain():
+            yield chunk
+
+    except SlowClientAborted:
+        # Propagate so the server drops the connection instead of ending the response cleanly
+        cancelled_by_client = True
+        raise
+    except asyncio.CancelledError:
+        cancelled_by_client = True
+    except (httpx.ReadError, httpx.RemoteProtocolError, httpx.ConnectError) as e:
+        cancelled_by_client = True
+        log_event("error", {"stage": "stream", "message": str(e)})
+        raise
+    finally:
+        # Upstream still running or frames left undelivered: the client went away
+        if not pump_task.done() or buffer.buffered_bytes:
+            cancelled_by_client = True
+            pump_task.cancel()
+            try:
+                await pump_task
+            except BaseException:
+                pass
+
+        log_final(cancelled_by_client)
@@ -0,0 +1,216 @@
+"""
+Per-stream buffering between the upstream SSE reader and the client writer.
+"""
+import time
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Any, Optional, AsyncIterator, Tuple
+
+
+# Supported slow-client policies
+POLICY_PAUSE = "pause"          # stop reading upstream until the client catches up
+POLICY_COALESCE = "coalesce"    # merge backlogged content deltas into fewer, larger frames
+POLICY_ABORT = "abort"          # give up on the client after a stall timeout
+SLOW_CLIENT_POLICIES = (POLICY_PAUSE, POLICY_COALESCE, POLICY_ABORT)
+
+
+class SlowClientAborted(Exception):
+    """Raised on the upstream side when a stalled client is abandoned."""
+
+
+class StreamBuffer:
+    """Byte-capped buffer that decouples upstream reads from client writes.
+
+    The upstream reader calls `put()` for every SSE frame; the client side
+    iterates `drain()`. When the buffered bytes exceed `max_bytes` the client
+    is considered stalled and the configured policy is applied. Under
+    `coalesce`, runs of buffered content deltas are first merged into single
+    frames; the reader only waits if that does not free enough space.
+    """
+
+    def __init__(self, max_bytes: int, policy: str = POLICY_PAUSE, stall_timeout: float = 30.0):
+        self.max_bytes = max_bytes
+        self.policy = policy if policy in SLOW_CLIENT_POLICIES else POLICY_PAUSE
+        self.stall_timeout = stall_timeout
+
+        # (frame, parsed chunk or None); the chunk lets `coalesce` merge content deltas
+        self._frames: Deque[Tuple[str, Optional[Dict[str, Any]]]] = deque()
+        self._buffered_bytes = 0
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._data_ready = asyncio.Event()
+        self._space_ready = asyncio.Event()
+        self._space_ready.set()
+
+        # Stats
+        self._started = time.monotonic()
+        self._first_in: Optional[float] = None
+        self._last_in: Optional[float] = None
+        self._first_out: Optional[float] = None
+        self._last_out: Optional[float] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.frames_in = 0
+        self.frames_out = 0
+        self.writes_out = 0
+        self.merged_frames = 0
+        self.peak_buffered_bytes = 0
+        self.stall_count = 0
+        self.stall_seconds = 0.0
+        self.aborted = False
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._buffered_bytes
+
+    async def put(self, frame: str, chunk: Optional[Dict[str, Any]] = None) -> None:
+        """Queue a frame for the client, applying the slow-client policy if full.
+
+        `chunk` is the parsed SSE payload of `frame`, if any; plain content
+        deltas among them can be merged by the `coalesce` policy.
+        """
+        if self.aborted:
+            raise SlowClientAborted()
+
+        if self._buffered_bytes >= self.max_bytes:
+            if self.policy == POLICY_COALESCE:
+                self._merge_backlog()
+            if self._buffered_bytes >= self.max_bytes:
+                await self._wait_for_space()
+            if self.aborted:
+                raise SlowClientAborted()
+
+        size = len(frame)
+        now = time.monotonic()
+        if self._first_in is None:
+            self._first_in = now
+        self._last_in = now
+        self.bytes_in += size
+        self.frames_in += 1
+
+        self._frames.append((frame, chunk))
+        self._buffered_bytes += size
+        if self._buffered_bytes > self.peak_buffered_bytes:
+            self.peak_buffered_bytes = self._buffered_bytes
+        if self._buffered_bytes >= self.max_bytes:
+            self._space_ready.clear()
+        self._data_ready.set()
+
+    async def _wait_for_space(self) -> None:
+        """Block the upstream reader until the client drains the buffer."""
+        self.stall_count += 1
+        stalled_at = time.monotonic()
+        try:
+            if self.policy == POLICY_ABORT:
+                try:
+                    await asyncio.wait_for(self._space_ready.wait(), timeout=self.stall_timeout)
+                except asyncio.TimeoutError:
+                    self.abort()
+                    raise SlowClientAborted()
+            else:
+                await self._space_ready.wait()
+        finally:
+            self.stall_seconds += time.monotonic() - stalled_at
+
+    def _merge_backlog(self) -> None:
+        """Merge runs of consecutive plain content deltas in the backlog into single frames."""
+        from handlers.delta_coalescer import DeltaCoalescer  # optional, imported on first use
+
+        merged: Deque[Tuple[str, Optional[Dict[str, Any]]]] = deque()
+        # No time window or size threshold: a run ends at the first frame it can't absorb
+        run = DeltaCoalescer(window_ms=float("inf"), max_bytes=float("inf"))
+        for frame, chunk in self._frames:
+            if chunk is not None and run.pending and not run.accepts(chunk):
+                merged.append(run.flush_chunk())  # different stream id: start a new run
+            if chunk is not None and run.accepts(chunk):
+                run.add(chunk, frame.rstrip("\n"))
+                continue
+            if run.pending:
+                merged.append(run.flush_chunk())
+            merged.append((frame, chunk))
+        if run.pending:
+            merged.append(run.flush_chunk())
+
+        self.merged_frames += len(self._frames) - len(merged)
+        self._frames = merged
+        self._buffered_bytes = sum(len(frame) for frame, _ in merged)
+        if self._buffered_bytes < self.max_bytes:
+            self._space_ready.set()
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """Mark the upstream side as finished, optionally with an error to re-raise."""
+        self._closed = True
+        if error is not None and self._error is None:
+            self._error = error
+        self._data_ready.set()
+
+    def abort(self) -> None:
+        """Drop buffered frames and stop accepting new ones."""
+        self.aborted = True
+        self._frames.clear()
+        self._buffered_bytes = 0
+        self._closed = True
+        self._space_ready.set()
+        self._data_ready.set()
+
+    def _take(self) -> str:
+        """Pop the next write for the client (whole backlog when coalescing)."""
+        if self.policy == POLICY_COALESCE and len(self._frames) > 1:
+            count = len(self._frames)
+            chunk = "".join(frame for frame, _ in self._frames)
+            self._frames.clear()
+        else:
+            count = 1
+            chunk = self._frames.popleft()[0]
+
+        self._buffered_bytes -= len(chunk)
+        if self._buffered_bytes < self.max_bytes:
+            self._space_ready.set()
+        if not self._frames:
+            self._data_ready.clear()
+
+        now = time.monotonic()
+        if self._first_out is None:
+            self._first_out = now
+        self._last_out = now
+        self.bytes_out += len(chunk)
+        self.frames_out += count
+        self.writes_out += 1
+        return chunk
+
+    async def drain(self) -> AsyncIterator[str]:
+        """Yield buffered chunks to the client until upstream is done."""
+        while True:
+            if self._frames:
+                yield self._take()
+                continue
+            if self._closed:
+                break
+            await self._data_ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def stats(self) -> Dict[str, Any]:
+        """Summary stats for the `response` event."""
+        def rate(nbytes: int, start: Optional[float], end: Optional[float]) -> Optional[float]:
+            if start is None or end is None or end <= start:
+                return None
+            return round(nbytes / (end - start), 1)
+
+        return {
+            "policy": self.policy,
+            "max_buffer_bytes": self.max_bytes,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "writes_out": self.writes_out,
+            "merged_frames": self.merged_frames,
+            "peak_buffered_bytes": self.peak_buffered_bytes,
+            "stall_count": self.stall_count,
+            "stall_seconds": round(self.stall_seconds, 3),
+            "upstream_bytes_per_s": rate(self.bytes_in, self._first_in, self._last_in),
+            "client_bytes_per_s": rate(self.bytes_out, self._first_out, self._last_out),
+            "duration_ms": int((time.monotonic() - self._started) * 1000),
+            "aborted": self.aborted,
+        }
@@ -7,6 +7,7 @@ from typing import Dict, Any, Optional, List
 
 from core.config import config
 from utils.logging_utils import log_event
+from utils.usage_tracker import usage_tracker
 from parsers.response_parser import extract_tool_calls_from_response, extract_choices_details
 
 
@@ -18,14 +19,24 @@ def log_response_event(
     finish_reason: Optional[str] = None,
     has_tool_calls: bool = False,
     tool_calls: Optional[List] = None,
+    reasoning_summary: Optional[str] = None,
+    response_id: Optional[str] = None,
     streaming: bool = False,
     content_length: int = 0,
     truncated: bool = False,
     req_id: Optional[str] = None,
     processing_ms: Optional[str] = None,
-    cancelled_by_client: bool = False
+    cancelled_by_client: bool = False,
+    stream_stats: Optional[Dict[str, Any]] = None,
+    auth: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    record_usage: bool = True
 ) -> None:
-    """Log response event with consistent format."""
+    """Log response event with consistent format.
+
+    `record_usage=False` logs the event without counting it in usage rollups
+    (e.g. a stream that failed before upstream started responding).
+    """
     
     response_log = {
         "model": payload.get("model"),
@@ -70,8 +81,17 @@ def log_response_event(
             "has_tool_calls": has_tool_calls,
             "tool_calls": tool_calls if tool_calls else None,
         })
+        if response_id:
+            response_log["response_id"] = response_id
+        if reasoning_summary:
+            response_log["reasoning_summary"] = reasoning_summary
+    
+    if stream_stats:
+        response_log["stream_stats"] = stream_stats
     
     log_event("response", response_log)
+    if record_usage:
+        usage_tracker.record(auth, response_log["model"], endpoint, response_log["usage"])
 
 
 def prepare_streaming_text_for_log(full_text: str, max_log_text: Optional[int] = None) -> tuple[str, bool]:
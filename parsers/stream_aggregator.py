@@ -0,0 +1,224 @@
+"""
+Incremental aggregation of streamed Chat Completions chunks and Responses API events.
+"""
+from typing import Dict, Any, List, Optional
+
+
+class StreamAggregator:
+    """Fold a stream of parsed SSE payloads into one normalized record.
+
+    Payloads are dispatched on their `type` (or the SSE `event:` name) through
+    `HANDLERS`; chat-completion chunks carry no type and go to `_on_chat_chunk`.
+    Every handler does constant work per event: text and argument fragments
+    are appended to lists and joined once in `result()`.
+    """
+
+    def __init__(self):
+        self.text_parts: List[str] = []
+        self.reasoning_parts: List[str] = []
+        self.usage: Optional[Dict[str, Any]] = None
+        self.finish_reason: Optional[str] = None
+        self.response_id: Optional[str] = None
+
+        # Tool calls keyed by chat `index` / Responses `output_index`
+        self._tool_calls: Dict[Any, Dict[str, Any]] = {}
+        # Responses API item id -> output_index, for events that only carry item_id
+        self._item_keys: Dict[str, Any] = {}
+        self._next_index = 0
+        self._summary_index = None
+
+    # ---- Entry points ----
+
+    def feed(self, obj: Dict[str, Any], event: Optional[str] = None) -> bool:
+        """Aggregate one parsed `data:` payload (`event` is the preceding SSE event name).
+
+        Returns True for a usage-only chat chunk (the `include_usage` tail), so
+        callers can drop it without inspecting the payload again.
+        """
+        handler = self.HANDLERS.get(obj.get("type") or event)
+        if handler is not None:
+            handler(self, obj)
+            return False
+        choices = obj.get("choices")
+        usage = obj.get("usage")
+        if choices is None and usage is None:
+            return False
+        self._on_chat_chunk(obj, choices, usage)
+        return not choices and bool(usage)
+
+    def result(self) -> Dict[str, Any]:
+        """Final record: text, tool_calls, reasoning_summary, usage, finish_reason."""
+        tool_calls = []
+        for _, entry in sorted(self._tool_calls.items(), key=lambda kv: kv[1]["order"]):
+            args = entry["final_args"] if entry["final_args"] is not None else "".join(entry["arg_parts"])
+            tool_calls.append({
+                "id": entry["id"],
+                "type": entry["type"],
+                "function_name": entry["function_name"],
+                "function_args": args,
+            })
+        return {
+            "response_id": self.response_id,
+            "text": "".join(self.text_parts),
+            "tool_calls": tool_calls,
+            "reasoning_summary": "".join(self.reasoning_parts) or None,
+            "usage": self.usage,
+            "finish_reason": self.finish_reason,
+        }
+
+    # ---- Tool call entries ----
+
+    def _tool_call(self, key: Any, order: Any = None) -> Dict[str, Any]:
+        entry = self._tool_calls.get(key)
+        if entry is None:
+            entry = {
+                "id": None,
+                "type": None,
+                "function_name": None,
+                "arg_parts": [],
+                "final_args": None,
+                # Numeric indexes sort first, anything else in arrival order
+                "order": (0, order) if isinstance(order, int) else (1, len(self._tool_calls)),
+            }
+            self._tool_calls[key] = entry
+        return entry
+
+    def _item_entry(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Tool call entry for a Responses event carrying output_index and/or item_id."""
+        key = obj.get("output_index")
+        if key is None:
+            key = self._item_keys.get(obj.get("item_id"), obj.get("item_id"))
+        return self._tool_call(("item", key), key)
+
+    # ---- Chat Completions ----
+
+    def _on_chat_chunk(self, obj: Dict[str, Any], choices: Any, usage: Any) -> None:
+        if self.response_id is None:
+            self.response_id = obj.get("id")  # chatcmpl-... id, repeated on every chunk
+        # Usage-only final chunk (include_usage) or usage attached to the finish chunk
+        if usage:
+            self.usage = usage
+        if not choices:
+            return
+        ch0 = choices[0] or {}
+        if ch0.get("finish_reason"):
+            self.finish_reason = ch0["finish_reason"]
+        delta = ch0.get("delta")
+        if not isinstance(delta, dict):
+            return
+
+        content = delta.get("content")
+        if isinstance(content, str) and content:
+            self.text_parts.append(content)
+        reasoning = delta.get("reasoning_content")
+        if isinstance(reasoning, str) and reasoning:
+            self.reasoning_parts.append(reasoning)
+
+        for tc in delta.get("tool_calls") or ():
+            idx = tc.get("index")
+            if idx is None:
+                # Fallback index if provider does not send index
+                idx = self._next_index
+            self._next_index = max(self._next_index, idx + 1)
+            entry = self._tool_call(("chat", idx), idx)
+            if not entry["id"] and tc.get("id"):
+                entry["id"] = tc["id"]
+            if not entry["type"] and tc.get("type"):
+                entry["type"] = tc["type"]
+            function = tc.get("function") or {}
+            if not entry["function_name"] and function.get("name"):
+                entry["function_name"] = function["name"]
+            if isinstance(function.get("arguments"), str):
+                entry["arg_parts"].append(function["arguments"])
+
+        # Legacy single function_call delta
+        function_call = delta.get("function_call")
+        if isinstance(function_call, dict):
+            entry = self._tool_call(("chat", 0), 0)
+            entry["type"] = entry["type"] or "function_call"
+            if not entry["function_name"] and function_call.get("name"):
+                entry["function_name"] = function_call["name"]
+            if isinstance(function_call.get("arguments"), str):
+                entry["arg_parts"].append(function_call["arguments"])
+
+    # ---- Responses API ----
+
+    def _on_response_created(self, obj: Dict[str, Any]) -> None:
+        response = obj.get("response") or {}
+        self.response_id = response.get("id") or self.response_id
+
+    def _on_output_text_delta(self, obj: Dict[str, Any]) -> None:
+        d = obj.get("delta")
+        if isinstance(d, dict):
+            d = d.get("text") or d.get("output_text")
+        if isinstance(d, str) and d:
+            self.text_parts.append(d)
+
+    def _on_reasoning_summary_delta(self, obj: Dict[str, Any]) -> None:
+        d = obj.get("delta")
+        if not isinstance(d, str) or not d:
+            return
+        summary_index = (obj.get("output_index"), obj.get("summary_index"))
+        if self._summary_index is not None and summary_index != self._summary_index:
+            self.reasoning_parts.append("\n\n")
+        self._summary_index = summary_index
+        self.reasoning_parts.append(d)
+
+    def _on_output_item(self, obj: Dict[str, Any], done: bool = False) -> None:
+        """`response.output_item.added` / `.done`: tool call metadata and final arguments."""
+        item = obj.get("item") or {}
+        item_type = item.get("type")
+        if item_type in (None, "message", "reasoning"):
+            return
+        if item.get("id") is not None and obj.get("output_index") is not None:
+            self._item_keys[item["id"]] = obj["output_index"]
+        entry = self._item_entry(obj)
+        entry["id"] = entry["id"] or item.get("call_id") or item.get("id")
+        entry["type"] = entry["type"] or item_type
+        entry["function_name"] = entry["function_name"] or item.get("name")
+        # `.done` carries the complete arguments (custom tools send `input`)
+        final_args = item.get("arguments", item.get("input"))
+        if done and isinstance(final_args, str):
+            entry["final_args"] = final_args
+
+    def _on_output_item_done(self, obj: Dict[str, Any]) -> None:
+        self._on_output_item(obj, done=True)
+
+    def _on_arguments_delta(self, obj: Dict[str, Any]) -> None:
+        d = obj.get("delta")
+        if isinstance(d, str):
+            self._item_entry(obj)["arg_parts"].append(d)
+
+    def _on_arguments_done(self, obj: Dict[str, Any]) -> None:
+        final_args = obj.get("arguments", obj.get("input"))
+        if isinstance(final_args, str):
+            self._item_entry(obj)["final_args"] = final_args
+
+    def _on_response_finished(self, obj: Dict[str, Any]) -> None:
+        """`response.completed` / `.incomplete` / `.failed`: usage and final status."""
+        response = obj.get("response") or {}
+        self.response_id = response.get("id") or self.response_id
+        if response.get("usage"):
+            self.usage = response["usage"]
+        incomplete = response.get("incomplete_details") or {}
+        self.finish_reason = incomplete.get("reason") or response.get("status") or self.finish_reason
+
+    HANDLERS = {
+        "response.created": _on_response_created,
+        "response.in_progress": _on_response_created,
+        "response.output_text.delta": _on_output_text_delta,
+        # Older / unified streaming event names
+        "output_text.delta": _on_output_text_delta,
+        "message.delta": _on_output_text_delta,
+        "response.delta": _on_output_text_delta,
+        "response.reasoning_summary_text.delta": _on_reasoning_summary_delta,
+        "response.output_item.added": _on_output_item,
+        "response.output_item.done": _on_output_item_done,
+        "response.function_call_arguments.delta": _on_arguments_delta,
+        "response.function_call_arguments.done": _on_arguments_done,
+        "response.custom_tool_call_input.delta": _on_arguments_delta,
+        "response.custom_tool_call_input.done": _on_arguments_done,
+        "response.completed": _on_response_finished,
+        "response.incomplete": _on_response_finished,
+        "response.failed": _on_response_finished,
+    }
@@ -1,8 +1,22 @@
 #!/bin/bash
 
 # AnabolicCursor Simple Startup Script
+# Usage: ./start.sh          - development mode (uvicorn --reload)
+#        ./start.sh --prod   - production mode (graceful drain; rerun to reload without downtime)
 set -e
 
+PROD_MODE=false
+if [ "$1" = "--prod" ]; then
+    PROD_MODE=true
+fi
+
+# Production mode: if the supervisor is already running, reload it in place
+if [ "$PROD_MODE" = true ] && [ -f .proxy_pid ] && kill -0 "$(cat .proxy_pid)" 2>/dev/null; then
+    kill -HUP "$(cat .proxy_pid)"
+    echo "🔄 Reload requested: new workers start, old ones drain active streams"
+    exit 0
+fi
+
 echo "🚀 Starting AnabolicCursor Proxy..."
 
 # Check virtual environment
@@ -13,6 +27,7 @@ fi
 
 # Kill existing processes quietly
 pkill -f "uvicorn.*core.app" 2>/dev/null || true
+pkill -f "python -m core.server" 2>/dev/null || true
 pkill -f "ngrok.*http.*8787" 2>/dev/null || true
 sleep 1
 
@@ -49,7 +64,11 @@ source venv/bin/activate
 pip install -q python-dotenv 2>/dev/null || true
 
 # Start proxy server (let logs go to the file, suppress only uvicorn startup noise)
-uvicorn core.app:app --host 0.0.0.0 --port 8787 --reload --log-level warning &
+if [ "$PROD_MODE" = true ]; then
+    HOST=0.0.0.0 PORT=8787 python -m core.server &
+else
+    uvicorn core.app:app --host 0.0.0.0 --port 8787 --reload --log-level warning &
+fi
 PROXY_PID=$!
 
 # Wait for proxy to be ready
@@ -71,13 +90,16 @@ echo $NGROK_PID > .ngrok_pid
 # Cleanup function
 cleanup() {
     echo "🛑 Stopping..."
-    kill $PROXY_PID $NGROK_PID 2>/dev/null || true
+    kill $PROXY_PID 2>/dev/null || true
+    # Production mode drains active streams before exiting
+    wait $PROXY_PID 2>/dev/null || true
+    kill $NGROK_PID 2>/dev/null || true
     rm -f .proxy_pid .ngrok_pid
     exit 0
 }
 
-# Handle Ctrl+C
-trap cleanup SIGINT
+# Handle Ctrl+C and termination
+trap cleanup SIGINT SIGTERM
 
 # Keep process running
 sleep 86400
\ No newline at end of file
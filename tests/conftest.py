@@ -0,0 +1,18 @@
+"""
+Shared pytest setup: import the app packages from the repo root and keep
+`log_event` output off disk.
+"""
+import os
+import sys
+import logging
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def _in_memory_logger(monkeypatch):
+    """Route `log_event` to a plain logger instead of creating logs/proxy.log."""
+    from utils import logging_utils
+    monkeypatch.setattr(logging_utils, "_logger", logging.getLogger("cursor-proxy-tests"))
@@ -0,0 +1,144 @@
+"""
+Circuit breaker transitions, probe slots, and routing to a fallback or 503.
+"""
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import core.config as core_config
+from core.config import ProxyConfig
+from utils import circuit_breaker
+from utils.circuit_breaker import (
+    BreakerRegistry, CircuitBreaker, CLOSED, OPEN, HALF_OPEN, classify_outcome, route_request,
+)
+
+URL = "https://api.example.com/v1/chat/completions"
+PAYLOAD = {"model": "gpt-5"}
+
+
+def use_config(monkeypatch, **env):
+    settings = {"CB_MIN_REQUESTS": "4", "CB_ERROR_RATE": "0.5", "CB_WINDOW_SECONDS": "60", "CB_OPEN_SECONDS": "30"}
+    settings.update(env)
+    monkeypatch.setattr(core_config, "_config", ProxyConfig(settings))
+
+
+@pytest.fixture(autouse=True)
+def breaker_config(monkeypatch):
+    use_config(monkeypatch)
+    monkeypatch.setattr(circuit_breaker, "breakers", BreakerRegistry())
+
+
+def open_breaker(breaker, now):
+    for _ in range(4):
+        breaker.record(True, now)
+    assert breaker.state == OPEN
+
+
+def test_classify_outcome():
+    assert classify_outcome(200) is None
+    assert classify_outcome(400) is None
+    assert classify_outcome(429) == "rate_limit"
+    assert classify_outcome(503) == "server_error"
+    assert classify_outcome(None) == "server_error"
+    assert classify_outcome(200, latency=60.0) is None  # `slow` is off without CB_LATENCY_MS
+
+
+def test_stays_closed_below_min_requests_then_opens_at_error_rate():
+    breaker = CircuitBreaker("up", "server_error")
+    for i in range(3):
+        breaker.record(True, 100.0 + i)
+    assert breaker.state == CLOSED  # 3 of 3 failed, but under CB_MIN_REQUESTS
+    breaker.record(False, 104.0)
+    assert breaker.state == OPEN  # 3 of 4 >= 0.5
+    assert not breaker.check(105.0)
+    assert breaker.retry_after(105.0) == pytest.approx(29.0)
+
+
+def test_old_failures_leave_the_window():
+    breaker = CircuitBreaker("up", "server_error")
+    for i in range(3):
+        breaker.record(True, 100.0 + i)
+    breaker.record(False, 200.0)  # the failures are more than CB_WINDOW_SECONDS old
+    assert breaker.state == CLOSED
+    assert breaker.error_rate() == 0.0
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker("up", "server_error")
+    open_breaker(breaker, 100.0)
+
+    assert breaker.check(130.0)
+    assert breaker.state == OPEN  # check() alone takes nothing
+    breaker.acquire(130.0)
+    assert breaker.state == HALF_OPEN
+    assert not breaker.check(131.0)  # probe in flight
+    assert breaker.check(160.0)  # probe never reported back: expired
+
+
+def test_probe_success_closes_and_failure_reopens():
+    breaker = CircuitBreaker("up", "server_error")
+    open_breaker(breaker, 100.0)
+    breaker.acquire(130.0)
+    breaker.record(False, 131.0)
+    assert breaker.state == CLOSED
+    assert breaker.error_rate() == 0.0 and breaker.check(131.0)
+
+    open_breaker(breaker, 200.0)
+    breaker.acquire(230.0)
+    breaker.record(True, 231.0)
+    assert breaker.state == OPEN
+    assert breaker.opened_at == 231.0
+    assert not breaker.check(240.0)
+
+
+def test_rejected_request_takes_no_probe_slot():
+    registry = BreakerRegistry()
+    rate_limit, server_error = registry._for_upstream("up")
+    now = time.monotonic()
+    open_breaker(rate_limit, now)  # still waiting out CB_OPEN_SECONDS
+    open_breaker(server_error, now - 100)
+    server_error.opened_at = now - 100  # ready for a probe
+
+    assert not registry.allow("up")
+    assert server_error.state == OPEN and server_error.probe_started_at is None
+    assert (rate_limit.rejected, server_error.rejected) == (1, 0)
+
+    rate_limit.opened_at = now - 100
+    assert registry.allow("up")
+    assert rate_limit.state == HALF_OPEN and server_error.state == HALF_OPEN
+
+
+def test_registry_records_the_failure_class_only():
+    registry = BreakerRegistry()
+    for _ in range(4):
+        registry.record("up", 429)
+    rate_limit, server_error = registry._for_upstream("up")
+    assert rate_limit.state == OPEN
+    assert server_error.state == CLOSED and server_error.error_rate() == 0.0
+
+
+def test_route_fails_fast_with_retry_after_when_open():
+    for _ in range(4):
+        circuit_breaker.breakers.record(circuit_breaker.upstream_key(URL, PAYLOAD), 503)
+    with pytest.raises(HTTPException) as exc:
+        route_request(URL, {"Authorization": "Bearer sk-a"}, PAYLOAD)
+    assert exc.value.status_code == 503
+    assert 1 <= int(exc.value.headers["Retry-After"]) <= 30
+    assert circuit_breaker.breakers.fail_fast == 1
+
+
+def test_route_goes_to_the_fallback_while_open(monkeypatch):
+    use_config(monkeypatch, FALLBACK_BASE_URL="https://fallback.example.com/proxy/", FALLBACK_MODEL="gpt-5-mini",
+               FALLBACK_API_KEY="sk-fb")
+    headers = {"Authorization": "Bearer sk-a"}
+    assert route_request(URL, headers, PAYLOAD)[0] == URL  # closed: primary
+
+    for _ in range(4):
+        circuit_breaker.breakers.record(circuit_breaker.upstream_key(URL, PAYLOAD), 500)
+    url, fb_headers, payload, upstream = route_request(URL, headers, PAYLOAD)
+    assert url == "https://fallback.example.com/proxy/v1/chat/completions"
+    assert payload["model"] == "gpt-5-mini" and PAYLOAD["model"] == "gpt-5"
+    assert fb_headers["Authorization"] == "Bearer sk-fb"
+    assert upstream == "https://fallback.example.com|gpt-5-mini"
+    assert circuit_breaker.breakers.fallbacks == 1
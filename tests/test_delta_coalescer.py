@@ -0,0 +1,90 @@
+"""
+DeltaCoalescer: which chunks merge, thresholds, and the merged SSE line.
+"""
+import json
+import asyncio
+
+from handlers.delta_coalescer import DeltaCoalescer, is_plain_content_delta
+
+
+def chunk(content, stream_id="c1", **delta):
+    return {"id": stream_id, "object": "chat.completion.chunk", "model": "gpt-5",
+            "choices": [{"index": 0, "delta": dict(delta, content=content), "finish_reason": None}]}
+
+
+def raw(obj):
+    return "data: " + json.dumps(obj)
+
+
+def test_only_plain_content_deltas_are_mergeable():
+    assert is_plain_content_delta(chunk("hi"))
+    assert is_plain_content_delta(chunk("hi", role=None))
+    assert not is_plain_content_delta(chunk("hi", role="assistant"))
+    assert not is_plain_content_delta(chunk(None))
+    assert not is_plain_content_delta({"id": "c1", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    assert not is_plain_content_delta({"id": "c1", "choices": [], "usage": {"prompt_tokens": 1}})
+    assert not is_plain_content_delta({"id": "c1", "choices": [{"index": 0, "finish_reason": None, "delta": {
+        "tool_calls": [{"index": 0, "function": {"arguments": "{}"}}]}}]})
+
+
+def test_flush_merges_held_content_onto_the_first_chunk():
+    coalescer = DeltaCoalescer(window_ms=1000, max_bytes=1000)
+    for piece in ("Hel", "lo", " world"):
+        assert coalescer.add(chunk(piece), raw(chunk(piece))) is None
+    line = coalescer.flush()
+
+    assert line.startswith("data: ") and line.endswith("\n")
+    merged = json.loads(line[6:])
+    assert merged["id"] == "c1" and merged["model"] == "gpt-5"
+    assert merged["choices"][0]["delta"]["content"] == "Hello world"
+    assert not coalescer.pending
+    assert coalescer.flush() is None
+    stats = coalescer.stats()
+    assert (stats["content_chunks_in"], stats["content_events_out"], stats["merged_events"]) == (3, 1, 1)
+
+
+def test_single_held_chunk_is_forwarded_as_its_raw_line():
+    coalescer = DeltaCoalescer(window_ms=1000, max_bytes=1000)
+    obj = chunk("only")
+    coalescer.add(obj, raw(obj))
+    line, flushed = coalescer.flush_chunk()
+    assert line == raw(obj) + "\n"
+    assert flushed is obj
+
+
+def test_byte_threshold_flushes_from_add():
+    coalescer = DeltaCoalescer(window_ms=60_000, max_bytes=8)
+    assert coalescer.add(chunk("abcd"), raw(chunk("abcd"))) is None
+    line = coalescer.add(chunk("efgh"), raw(chunk("efgh")))
+    assert json.loads(line[6:])["choices"][0]["delta"]["content"] == "abcdefgh"
+    assert not coalescer.pending
+
+
+def test_chunks_from_another_stream_are_not_accepted():
+    coalescer = DeltaCoalescer(window_ms=1000, max_bytes=1000)
+    assert coalescer.accepts(chunk("a"))
+    coalescer.add(chunk("a"), raw(chunk("a")))
+    assert coalescer.accepts(chunk("b"))
+    assert not coalescer.accepts(chunk("b", stream_id="other"))
+
+
+def test_wrap_lines_ticks_when_the_window_elapses():
+    async def upstream():
+        yield raw(chunk("a"))
+        await asyncio.sleep(0.2)
+        yield raw(chunk("b"))
+
+    async def scenario():
+        coalescer = DeltaCoalescer(window_ms=20, max_bytes=1000)
+        seen = []
+        async for line in coalescer.wrap_lines(upstream()):
+            if line is None:
+                seen.append(None)
+                seen.append(json.loads(coalescer.flush()[6:])["choices"][0]["delta"]["content"])
+                continue
+            coalescer.add(json.loads(line[6:]), line)
+        seen.append(json.loads(coalescer.flush()[6:])["choices"][0]["delta"]["content"])
+        return seen
+
+    # The first chunk is flushed on the deadline tick, long before "b" arrives
+    assert asyncio.run(scenario()) == [None, "a", "b"]
@@ -0,0 +1,8 @@
+"""
+Cold-start import budget from benchmarks/import_time.py, run as a test.
+"""
+from benchmarks.import_time import main
+
+
+def test_import_within_budget_and_leaves_no_files():
+    assert main(["--runs", "3"]) == 0
@@ -0,0 +1,153 @@
+"""
+StreamAggregator on chat-completion chunks, Responses API events and a mix of both.
+"""
+from parsers.stream_aggregator import StreamAggregator
+
+
+def chat(delta=None, finish_reason=None, usage=None, stream_id="chatcmpl-1"):
+    obj = {"id": stream_id, "object": "chat.completion.chunk",
+           "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+    if usage is not None:
+        obj["usage"] = usage
+    return obj
+
+
+def test_chat_text_finish_and_usage_only_chunk():
+    aggregator = StreamAggregator()
+    usage = {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13}
+    results = [
+        aggregator.feed(chat({"role": "assistant", "content": ""})),
+        aggregator.feed(chat({"content": "Hel"})),
+        aggregator.feed(chat({"content": "lo", "reasoning_content": "think"})),
+        aggregator.feed(chat({}, finish_reason="stop")),
+        aggregator.feed(chat(usage=usage)),
+    ]
+    # Only the include_usage tail is reported as usage-only
+    assert results == [False, False, False, False, True]
+    assert aggregator.result() == {
+        "response_id": "chatcmpl-1",
+        "text": "Hello",
+        "tool_calls": [],
+        "reasoning_summary": "think",
+        "usage": usage,
+        "finish_reason": "stop",
+    }
+
+
+def test_usage_on_the_finish_chunk_is_not_usage_only():
+    aggregator = StreamAggregator()
+    assert aggregator.feed(chat({}, finish_reason="length", usage={"completion_tokens": 5})) is False
+    assert aggregator.result()["usage"] == {"completion_tokens": 5}
+    assert aggregator.result()["finish_reason"] == "length"
+
+
+def test_payloads_without_choices_or_usage_are_ignored():
+    aggregator = StreamAggregator()
+    assert aggregator.feed({"error": {"message": "boom"}}) is False
+    assert aggregator.result()["response_id"] is None
+
+
+def test_chat_parallel_tool_calls_with_interleaved_fragments():
+    aggregator = StreamAggregator()
+    for idx, name in ((1, "write"), (0, "read")):
+        aggregator.feed(chat({"tool_calls": [{"index": idx, "id": f"call_{idx}", "type": "function",
+                                              "function": {"name": name, "arguments": ""}}]}))
+    for idx, fragment in ((0, '{"pa'), (1, '{"x"'), (0, 'th": "a"}'), (1, ': 1}')):
+        aggregator.feed(chat({"tool_calls": [{"index": idx, "function": {"arguments": fragment}}]}))
+    aggregator.feed(chat({}, finish_reason="tool_calls"))
+
+    result = aggregator.result()
+    assert result["finish_reason"] == "tool_calls"
+    assert result["tool_calls"] == [
+        {"id": "call_0", "type": "function", "function_name": "read", "function_args": '{"path": "a"}'},
+        {"id": "call_1", "type": "function", "function_name": "write", "function_args": '{"x": 1}'},
+    ]
+
+
+def test_legacy_function_call_delta():
+    aggregator = StreamAggregator()
+    aggregator.feed(chat({"function_call": {"name": "lookup", "arguments": '{"q":'}}))
+    aggregator.feed(chat({"function_call": {"arguments": ' "x"}'}}))
+    assert aggregator.result()["tool_calls"] == [
+        {"id": None, "type": "function_call", "function_name": "lookup", "function_args": '{"q": "x"}'},
+    ]
+
+
+def responses_events():
+    item = {"type": "function_call", "id": "fc_2", "call_id": "call_2", "name": "run", "arguments": ""}
+    return [
+        {"type": "response.created", "response": {"id": "resp_1", "status": "in_progress"}},
+        {"type": "response.output_item.added", "output_index": 0, "item": {"type": "reasoning", "id": "rs_1"}},
+        {"type": "response.reasoning_summary_text.delta", "item_id": "rs_1", "output_index": 0, "summary_index": 0, "delta": "Plan"},
+        {"type": "response.reasoning_summary_text.delta", "item_id": "rs_1", "output_index": 0, "summary_index": 1, "delta": "Act"},
+        {"type": "response.output_item.added", "output_index": 1, "item": {"type": "message", "id": "msg_1"}},
+        {"type": "response.output_text.delta", "item_id": "msg_1", "output_index": 1, "delta": "Done"},
+        {"type": "response.output_text.delta", "item_id": "msg_1", "output_index": 1, "delta": "."},
+        {"type": "response.output_item.added", "output_index": 2, "item": item},
+        # Argument events may carry only item_id
+        {"type": "response.function_call_arguments.delta", "item_id": "fc_2", "delta": '{"cmd":'},
+        {"type": "response.function_call_arguments.delta", "item_id": "fc_2", "delta": ' "ls"'},
+        {"type": "response.function_call_arguments.done", "item_id": "fc_2", "output_index": 2, "arguments": '{"cmd": "ls"}'},
+        {"type": "response.output_item.done", "output_index": 2, "item": dict(item, arguments='{"cmd": "ls"}')},
+        {"type": "response.completed", "response": {"id": "resp_1", "status": "completed",
+                                                    "usage": {"input_tokens": 9, "output_tokens": 4}}},
+    ]
+
+
+def test_responses_api_stream():
+    aggregator = StreamAggregator()
+    assert not any(aggregator.feed(obj) for obj in responses_events())
+    assert aggregator.result() == {
+        "response_id": "resp_1",
+        "text": "Done.",
+        "tool_calls": [{"id": "call_2", "type": "function_call", "function_name": "run", "function_args": '{"cmd": "ls"}'}],
+        "reasoning_summary": "Plan\n\nAct",
+        "usage": {"input_tokens": 9, "output_tokens": 4},
+        "finish_reason": "completed",
+    }
+
+
+def test_responses_incomplete_reports_the_reason():
+    aggregator = StreamAggregator()
+    aggregator.feed({"type": "response.incomplete", "response": {
+        "id": "resp_2", "status": "incomplete", "incomplete_details": {"reason": "max_output_tokens"}}})
+    assert aggregator.result()["finish_reason"] == "max_output_tokens"
+    assert aggregator.result()["response_id"] == "resp_2"
+
+
+def test_custom_tool_input_and_sse_event_name_dispatch():
+    aggregator = StreamAggregator()
+    aggregator.feed({"output_index": 0, "item": {"type": "custom_tool_call", "id": "ct_1", "call_id": "call_c", "name": "patch"}},
+                    "response.output_item.added")
+    aggregator.feed({"output_index": 0, "delta": "*** Begin"}, "response.custom_tool_call_input.delta")
+    aggregator.feed({"output_index": 0, "delta": " Patch"}, "response.custom_tool_call_input.delta")
+    aggregator.feed({"delta": "ok"}, "output_text.delta")
+    assert aggregator.result()["tool_calls"] == [
+        {"id": "call_c", "type": "custom_tool_call", "function_name": "patch", "function_args": "*** Begin Patch"},
+    ]
+    assert aggregator.result()["text"] == "ok"
+
+
+def test_mixed_chat_and_responses_events_dispatch_independently():
+    aggregator = StreamAggregator()
+    events = responses_events()
+    mixed = [
+        events[0],
+        chat({"content": "chat "}),
+        *events[1:7],
+        chat({"tool_calls": [{"index": 0, "id": "call_chat", "type": "function",
+                              "function": {"name": "grep", "arguments": "{}"}}]}),
+        *events[7:-1],
+        chat(usage={"prompt_tokens": 1}),
+        events[-1],
+    ]
+    usage_only = [aggregator.feed(obj) for obj in mixed]
+
+    assert usage_only.count(True) == 1
+    result = aggregator.result()
+    assert result["response_id"] == "resp_1"  # set by response.created before any chat chunk
+    assert result["text"] == "chat Done."
+    assert result["reasoning_summary"] == "Plan\n\nAct"
+    assert [call["id"] for call in result["tool_calls"]] == ["call_chat", "call_2"]
+    assert result["tool_calls"][1]["function_args"] == '{"cmd": "ls"}'
+    assert result["usage"] == {"input_tokens": 9, "output_tokens": 4}  # the last usage seen wins
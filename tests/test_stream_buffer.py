@@ -0,0 +1,159 @@
+"""
+StreamBuffer slow-client policies: pause, coalesce and abort.
+"""
+import json
+import asyncio
+
+import pytest
+
+from handlers.stream_buffer import StreamBuffer, SlowClientAborted
+
+
+def content_frame(i, stream_id="c1"):
+    obj = {"id": stream_id, "object": "chat.completion.chunk",
+           "choices": [{"index": 0, "delta": {"content": f"w{i} "}, "finish_reason": None}]}
+    return "data: " + json.dumps(obj) + "\n", obj
+
+
+TOOL_CALL = {"id": "c1", "choices": [{"index": 0, "finish_reason": None, "delta": {"tool_calls": [
+    {"index": 0, "id": "call_1", "type": "function", "function": {"name": "run", "arguments": ""}}]}}]}
+
+
+def parse_frames(output):
+    """(text, positions in the text where tool-call frames appeared)."""
+    text, tool_positions = "", []
+    for line in output.splitlines():
+        if not line.startswith("data: "):
+            continue
+        delta = json.loads(line[6:])["choices"][0]["delta"]
+        if "tool_calls" in delta:
+            tool_positions.append(len(text))
+        text += delta.get("content", "")
+    return text, tool_positions
+
+
+async def drain_all(buffer):
+    return "".join([chunk async for chunk in buffer.drain()])
+
+
+def test_frames_delivered_in_order_then_drain_ends_on_close():
+    async def scenario():
+        buffer = StreamBuffer(max_bytes=10_000)
+        for i in range(5):
+            await buffer.put(*content_frame(i))
+        buffer.close()
+        return buffer, await drain_all(buffer)
+
+    buffer, output = asyncio.run(scenario())
+    assert parse_frames(output)[0] == "w0 w1 w2 w3 w4 "
+    assert buffer.stats()["frames_out"] == 5
+    assert buffer.buffered_bytes == 0
+
+
+def test_drain_raises_the_close_error_after_buffered_frames():
+    async def scenario():
+        buffer = StreamBuffer(max_bytes=10_000)
+        await buffer.put(*content_frame(0))
+        buffer.close(RuntimeError("upstream failed"))
+        received = []
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            async for chunk in buffer.drain():
+                received.append(chunk)
+        return received
+
+    assert len(asyncio.run(scenario())) == 1
+
+
+def test_pause_blocks_the_reader_until_the_client_drains():
+    async def scenario():
+        buffer = StreamBuffer(max_bytes=500, policy="pause")
+
+        async def produce():
+            for i in range(50):
+                await buffer.put(*content_frame(i))
+            buffer.close()
+
+        producer = asyncio.ensure_future(produce())
+        await asyncio.sleep(0.05)
+        blocked = not producer.done()
+        peak_while_blocked = buffer.buffered_bytes
+        output = await drain_all(buffer)
+        await producer
+        return buffer, blocked, peak_while_blocked, output
+
+    buffer, blocked, peak, output = asyncio.run(scenario())
+    assert blocked
+    assert peak < 500 + 200  # at most one frame past the cap
+    assert parse_frames(output)[0] == "".join(f"w{i} " for i in range(50))
+    assert buffer.stall_count > 0
+
+
+def test_coalesce_merges_backlog_so_the_reader_never_blocks():
+    async def scenario():
+        buffer = StreamBuffer(max_bytes=2000, policy="coalesce")
+        for i in range(100):
+            await buffer.put(*content_frame(i))
+        await buffer.put("data: " + json.dumps(TOOL_CALL) + "\n", TOOL_CALL)
+        for i in range(100, 200):
+            await buffer.put(*content_frame(i))
+        buffer.close()
+        return buffer, await drain_all(buffer)
+
+    # No reads while producing: without merging the producer would wait forever
+    buffer, output = asyncio.run(asyncio.wait_for(scenario(), 5))
+    text, tool_positions = parse_frames(output)
+    assert text == "".join(f"w{i} " for i in range(200))
+    assert tool_positions == [len("".join(f"w{i} " for i in range(100)))]
+    stats = buffer.stats()
+    assert stats["merged_frames"] > 0
+    assert stats["stall_count"] == 0
+
+
+def test_coalesce_does_not_merge_across_stream_ids():
+    async def scenario():
+        buffer = StreamBuffer(max_bytes=300, policy="coalesce")
+        for i in range(3):
+            await buffer.put(*content_frame(i, "a"))
+        for i in range(3, 6):
+            await buffer.put(*content_frame(i, "b"))
+        buffer.close()
+        return await drain_all(buffer)
+
+    chunks = [json.loads(line[6:]) for line in asyncio.run(scenario()).splitlines() if line.startswith("data: ")]
+    # Stream "a" merged into one frame; "b" frames never absorbed into it
+    assert chunks[0]["id"] == "a"
+    assert chunks[0]["choices"][0]["delta"]["content"] == "w0 w1 w2 "
+    assert {chunk["id"] for chunk in chunks[1:]} == {"b"}
+
+
+def test_coalesce_writes_the_whole_backlog_at_once():
+    async def scenario():
+        buffer = StreamBuffer(max_bytes=10_000, policy="coalesce")
+        for i in range(10):
+            await buffer.put(*content_frame(i))
+        buffer.close()
+        writes = [chunk async for chunk in buffer.drain()]
+        return buffer, writes
+
+    buffer, writes = asyncio.run(scenario())
+    assert len(writes) == 1
+    assert buffer.stats()["frames_out"] == 10
+
+
+def test_abort_gives_up_on_a_stalled_client():
+    async def scenario():
+        buffer = StreamBuffer(max_bytes=200, policy="abort", stall_timeout=0.05)
+        with pytest.raises(SlowClientAborted):
+            for i in range(50):
+                await buffer.put(*content_frame(i))
+        assert buffer.aborted
+        assert buffer.buffered_bytes == 0
+        with pytest.raises(SlowClientAborted):
+            await buffer.put(*content_frame(99))
+        # proxy_stream closes with the error so the client connection is dropped, not ended cleanly
+        buffer.close(SlowClientAborted())
+        with pytest.raises(SlowClientAborted):
+            await drain_all(buffer)
+        return buffer
+
+    assert asyncio.run(scenario()).stats()["aborted"] is True
@@ -1,5 +1,6 @@
+import hmac
 from typing import Optional, Dict, Any
-from fastapi import Request, HTTPException
+from fastapi import Request, HTTPException, Header
 from core.config import config
 
 
@@ -33,3 +34,20 @@ def resolve_auth(request: Request, provided: Optional[str], body: Optional[Dict[
         return normalize_bearer(config.openai_api_key)
     
     raise HTTPException(status_code=401, detail="Missing API key")
+
+
+def require_admin(request: Request, x_admin_token: Optional[str] = Header(None)) -> None:
+    """Guard admin endpoints.
+
+    With ADMIN_TOKEN set, the X-Admin-Token header must match it. Without it,
+    only direct loopback clients are allowed (tunneled requests carry
+    X-Forwarded-For and are rejected).
+    """
+    if config.admin_token:
+        if not x_admin_token or not hmac.compare_digest(x_admin_token, config.admin_token):
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+        return
+    
+    client_host = request.client.host if request.client else None
+    if client_host not in ("127.0.0.1", "::1", "localhost") or "x-forwarded-for" in request.headers:
+        raise HTTPException(status_code=403, detail="Admin endpoints are local-only without ADMIN_TOKEN")
@@ -0,0 +1,236 @@
+"""
+Circuit breaker for upstream calls, keyed by upstream and status class.
+
+Each upstream (base URL + model) gets one breaker per failure class:
+`rate_limit` (429), `server_error` (5xx and transport errors) and, when
+CB_LATENCY_MS is set, `slow` (responses slower than the threshold). A breaker
+opens when its failure rate over the sliding window crosses CB_ERROR_RATE,
+then lets a single probe through every CB_OPEN_SECONDS until one succeeds.
+"""
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException
+
+from core.config import config
+from utils.logging_utils import log_event
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATUS_CLASSES = ("rate_limit", "server_error", "slow")
+
+
+def classify_outcome(status: Optional[int], latency: Optional[float] = None) -> Optional[str]:
+    """Map an upstream outcome to a failure class (None means success).
+
+    `status` is None for transport errors (connect/read failures).
+    """
+    if status is None or status >= 500:
+        return "server_error"
+    if status == 429:
+        return "rate_limit"
+    latency_ms = config.cb_latency_ms
+    if latency_ms > 0 and latency is not None and latency * 1000 > latency_ms:
+        return "slow"
+    return None
+
+
+class CircuitBreaker:
+    """Sliding-window breaker for one (upstream, status class) pair."""
+
+    def __init__(self, upstream: str, status_class: str):
+        self.upstream = upstream
+        self.status_class = status_class
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started_at: Optional[float] = None
+        self._window: deque = deque()  # (timestamp, failed)
+        self._failures = 0
+        self.transitions = 0
+        self.rejected = 0
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - config.cb_window_seconds
+        while self._window and self._window[0][0] < cutoff:
+            _, failed = self._window.popleft()
+            if failed:
+                self._failures -= 1
+
+    def error_rate(self) -> float:
+        return self._failures / len(self._window) if self._window else 0.0
+
+    def check(self, now: float) -> bool:
+        """Whether a request may go to this upstream right now (no side effects)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return now - self.opened_at >= config.cb_open_seconds
+        # Half-open: one probe at a time; a probe that never reports back expires
+        return self.probe_started_at is None or now - self.probe_started_at >= config.cb_open_seconds
+
+    def acquire(self, now: float) -> None:
+        """Take the probe slot for a request that passed `check()` and will be sent."""
+        if self.state == CLOSED:
+            return
+        if self.state == OPEN:
+            self._transition(HALF_OPEN, now)
+        self.probe_started_at = now
+
+    def record(self, failed: bool, now: float) -> None:
+        """Record an outcome and open or close the breaker as needed."""
+        if self.state == HALF_OPEN:
+            self.probe_started_at = None
+            if failed:
+                self._transition(OPEN, now)
+            else:
+                self._window.clear()
+                self._failures = 0
+                self._transition(CLOSED, now)
+            return
+        if self.state == OPEN:
+            return
+
+        self._window.append((now, failed))
+        if failed:
+            self._failures += 1
+        self._trim(now)
+        if len(self._window) >= config.cb_min_requests and self.error_rate() >= config.cb_error_rate:
+            self._transition(OPEN, now)
+
+    def retry_after(self, now: float) -> float:
+        """Seconds until the next half-open probe is allowed."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, config.cb_open_seconds - (now - self.opened_at))
+
+    def _transition(self, new_state: str, now: float) -> None:
+        old_state = self.state
+        self.state = new_state
+        self.transitions += 1
+        if new_state == OPEN:
+            self.opened_at = now
+        log_event("circuit_breaker", {
+            "upstream": self.upstream,
+            "status_class": self.status_class,
+            "from": old_state,
+            "to": new_state,
+            "error_rate": round(self.error_rate(), 3),
+            "window_requests": len(self._window),
+        })
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        self._trim(now)
+        return {
+            "upstream": self.upstream,
+            "status_class": self.status_class,
+            "state": self.state,
+            "error_rate": round(self.error_rate(), 3),
+            "window_requests": len(self._window),
+            "retry_after_s": round(self.retry_after(now), 1),
+            "transitions": self.transitions,
+            "rejected": self.rejected,
+        }
+
+
+class BreakerRegistry:
+    """All breakers of the process plus routing counters."""
+
+    def __init__(self):
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self.fail_fast = 0
+        self.fallbacks = 0
+
+    def _for_upstream(self, upstream: str) -> list:
+        classes = STATUS_CLASSES if config.cb_latency_ms > 0 else STATUS_CLASSES[:2]
+        result = []
+        for status_class in classes:
+            key = (upstream, status_class)
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(upstream, status_class)
+            result.append(breaker)
+        return result
+
+    def allow(self, upstream: str) -> bool:
+        """Whether a request may be sent; probe slots are only taken when every class agrees."""
+        now = time.monotonic()
+        group = self._for_upstream(upstream)
+        refused = [b for b in group if not b.check(now)]
+        if refused:
+            for b in refused:
+                b.rejected += 1
+            return False
+        for b in group:
+            b.acquire(now)
+        return True
+
+    def record(self, upstream: str, status: Optional[int], latency: Optional[float] = None) -> None:
+        if not config.cb_enabled:
+            return
+        now = time.monotonic()
+        failed_class = classify_outcome(status, latency)
+        for b in self._for_upstream(upstream):
+            b.record(b.status_class == failed_class, now)
+
+    def retry_after(self, upstream: str) -> float:
+        now = time.monotonic()
+        return max(b.retry_after(now) for b in self._for_upstream(upstream))
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "enabled": config.cb_enabled,
+            "fail_fast": self.fail_fast,
+            "fallbacks": self.fallbacks,
+            "breakers": [b.snapshot(now) for b in self._breakers.values()],
+        }
+
+
+breakers = BreakerRegistry()
+
+
+def upstream_key(url: str, payload: Dict[str, Any]) -> str:
+    """Identify an upstream by scheme, host and model."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}|{payload.get('model')}"
+
+
+def route_request(url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> Tuple[str, Dict[str, str], Dict[str, Any], str]:
+    """Pick the upstream for the next attempt.
+
+    Returns (url, headers, payload, upstream_key). Goes to the fallback
+    upstream/model when the primary breaker is open, and fails fast with 503
+    when no route is available.
+    """
+    primary = upstream_key(url, payload)
+    if not config.cb_enabled or breakers.allow(primary):
+        return url, headers, payload, primary
+
+    fallback_base_url, fallback_model = config.fallback_base_url, config.fallback_model
+    if fallback_base_url or fallback_model:
+        fb_url = url
+        if fallback_base_url:
+            parts = urlsplit(url)
+            fb_url = fallback_base_url + url[len(f"{parts.scheme}://{parts.netloc}"):]
+        fb_payload = dict(payload, model=fallback_model) if fallback_model else payload
+        fb_headers = headers
+        if config.fallback_api_key:
+            fb_headers = dict(headers, Authorization=f"Bearer {config.fallback_api_key}")
+        fallback = upstream_key(fb_url, fb_payload)
+        if fallback != primary and breakers.allow(fallback):
+            breakers.fallbacks += 1
+            log_event("circuit_fallback", {"from": primary, "to": fallback})
+            return fb_url, fb_headers, fb_payload, fallback
+
+    breakers.fail_fast += 1
+    retry_after = breakers.retry_after(primary)
+    log_event("circuit_fail_fast", {"upstream": primary, "retry_after": round(retry_after, 1)})
+    raise HTTPException(
+        status_code=503,
+        detail=f"Upstream circuit open for {primary}",
+        headers={"Retry-After": str(max(1, int(retry_after + 0.5)))},
+    )
@@ -0,0 +1,201 @@
+"""
+Runtime diagnostics: event-loop lag and in-flight request tracing.
+
+Everything here is a no-op unless DIAGNOSTICS_ENABLED is set, so the hot path
+only pays for a method call on a shared null trace.
+"""
+import os
+import time
+import asyncio
+import itertools
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+# Read here rather than from ProxyConfig: logging checks it and config logs through logging.
+# A switch can't fail to parse; numeric settings come from ProxyConfig.
+DIAGNOSTICS_ENABLED = os.getenv("DIAGNOSTICS_ENABLED", "").strip().lower() in ("1", "true", "yes", "on")
+
+# Request states, in lifecycle order
+STATE_QUEUED = "queued"
+STATE_AWAITING_UPSTREAM = "awaiting_upstream"
+STATE_STREAMING = "streaming"
+STATE_LOGGING = "logging"
+
+
+# ---- Stage timings ----
+
+class StageStats:
+    """Cumulative time spent per named stage across all requests."""
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        s = self._stages.get(stage)
+        if s is None:
+            s = self._stages[stage] = {"count": 0, "total": 0.0, "max": 0.0}
+        s["count"] += 1
+        s["total"] += seconds
+        if seconds > s["max"]:
+            s["max"] = seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "count": int(s["count"]),
+                "total_ms": round(s["total"] * 1000, 2),
+                "avg_ms": round(s["total"] / s["count"] * 1000, 3) if s["count"] else 0.0,
+                "max_ms": round(s["max"] * 1000, 2),
+            }
+            for name, s in self._stages.items()
+        }
+
+
+stage_stats = StageStats()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record time spent in a stage (no-op when diagnostics are disabled)."""
+    if DIAGNOSTICS_ENABLED:
+        stage_stats.record(stage, seconds)
+
+
+# ---- In-flight request tracing ----
+
+class RequestTrace:
+    """State and per-stage timings of a single in-flight proxy request."""
+
+    active = True
+
+    def __init__(self, request_id: int, endpoint: str, model: Optional[str], stream: bool,
+                 started: Optional[float] = None):
+        self.request_id = request_id
+        self.endpoint = endpoint
+        self.model = model
+        self.stream = stream
+        self.started = started if started is not None else time.monotonic()
+        self.state = STATE_QUEUED
+        self.state_since = self.started
+        self.stages: Dict[str, float] = {}
+
+    def set_state(self, state: str) -> None:
+        """Move to a new state, accounting the time spent in the previous one."""
+        now = time.monotonic()
+        self._account(self.state, now - self.state_since)
+        self.state = state
+        self.state_since = now
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """Account time for a sub-stage that does not change the request state."""
+        self._account(stage, seconds)
+
+    def _account(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        stage_stats.record(stage, seconds)
+
+    def finish(self) -> None:
+        self.set_state("done")
+        _inflight.pop(self.request_id, None)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "id": self.request_id,
+            "endpoint": self.endpoint,
+            "model": self.model,
+            "stream": self.stream,
+            "state": self.state,
+            "age_ms": int((now - self.started) * 1000),
+            "state_age_ms": int((now - self.state_since) * 1000),
+            "stages_ms": {k: round(v * 1000, 2) for k, v in self.stages.items()},
+        }
+
+
+class _NullTrace:
+    """Shared stand-in used when diagnostics are disabled."""
+
+    active = False
+
+    def set_state(self, state: str) -> None:
+        pass
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+NULL_TRACE = _NullTrace()
+_inflight: Dict[int, RequestTrace] = {}
+_request_ids = itertools.count(1)
+
+
+def track_request(endpoint: str, model: Optional[str] = None, stream: bool = False,
+                  started: Optional[float] = None):
+    """Start tracing a request; returns NULL_TRACE when diagnostics are disabled."""
+    if not DIAGNOSTICS_ENABLED:
+        return NULL_TRACE
+    trace = RequestTrace(next(_request_ids), endpoint, model, stream, started)
+    _inflight[trace.request_id] = trace
+    return trace
+
+
+def inflight_snapshot() -> list:
+    """List in-flight requests, oldest first."""
+    now = time.monotonic()
+    return [t.snapshot(now) for t in sorted(_inflight.values(), key=lambda t: t.started)]
+
+
+# ---- Event-loop lag ----
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes up from a fixed-interval sleep."""
+
+    def __init__(self, interval: Optional[float] = None, window: int = 120):
+        self.interval = interval  # LOOP_LAG_INTERVAL when None, resolved on start()
+        self._samples: deque = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        if self.interval is None:
+            from core.config import config  # core.config imports this module via logging
+            self.interval = config.loop_lag_interval
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - expected)
+            self._samples.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"running": self._task is not None, "samples": 0}
+        return {
+            "running": self._task is not None,
+            "interval_ms": int(self.interval * 1000),
+            "samples": len(samples),
+            "last_ms": round(self._samples[-1] * 1000, 2),
+            "avg_ms": round(sum(samples) / len(samples) * 1000, 2),
+            "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+loop_lag = LoopLagMonitor()
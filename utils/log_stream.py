@@ -0,0 +1,187 @@
+"""
+In-process fan-out of `log_event` emissions for live admin subscriptions.
+
+Events are appended to one shared ring while anyone is subscribed; every
+subscriber reads it at its own cursor. Entries every subscriber has read are
+dropped, and the ring is capped by entry count and by serialized size. A
+subscriber whose entries were evicted skips ahead and is told how many events
+matching its filter it missed, so publishing never waits on a slow reader.
+"""
+import json
+import asyncio
+from collections import deque
+from itertools import islice
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class LogFilter:
+    """Server-side filter and field projection for one subscription."""
+
+    def __init__(self, events: Optional[Set[str]] = None, model: Optional[str] = None,
+                 has_tool_calls: Optional[bool] = None, request_id: Optional[str] = None,
+                 fields: Optional[List[str]] = None):
+        self.events = events
+        self.model = model
+        self.has_tool_calls = has_tool_calls
+        self.request_id = request_id
+        self.fields = [f.split(".") for f in fields] if fields else None
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.events is not None and event.get("event") not in self.events:
+            return False
+        data = event.get("data")
+        if not isinstance(data, dict):
+            data = {}
+        if self.model is not None and data.get("model") != self.model:
+            return False
+        if self.has_tool_calls is not None and bool(data.get("has_tool_calls")) != self.has_tool_calls:
+            return False
+        if self.request_id is not None and self.request_id not in (
+            data.get("openai_request_id"), data.get("response_id"), data.get("request_id")
+        ):
+            return False
+        return True
+
+    def project(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep only the requested dotted paths (e.g. `data.usage`); missing paths are skipped."""
+        if self.fields is None:
+            return event
+        out: Dict[str, Any] = {}
+        for path in self.fields:
+            value = event
+            for key in path:
+                if not isinstance(value, dict) or key not in value:
+                    break
+                value = value[key]
+            else:
+                target = out
+                for key in path[:-1]:
+                    target = target.setdefault(key, {})
+                target[path[-1]] = value
+        return out
+
+
+class LogSubscriber:
+    """Cursor into the shared ring plus a wakeup for its reader."""
+
+    def __init__(self, log_filter: LogFilter, cursor: int):
+        self.filter = log_filter
+        self.cursor = cursor
+        # Matching events evicted before this subscriber read them, not yet reported
+        self.missed = 0
+        self.dropped = 0
+        self.delivered = 0
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)  # log_event called off the loop thread
+        except RuntimeError:
+            pass  # loop already closed
+
+    async def wait(self, timeout: float) -> None:
+        """Wait until new events are published or `timeout` elapses."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+class LogBroadcaster:
+    """Shared ring of recent events, filled only while there are subscribers."""
+
+    def __init__(self, ring_size: Optional[int] = None, ring_bytes: Optional[int] = None,
+                 max_subscribers: Optional[int] = None):
+        # LOG_STREAM_* settings fill in the limits left as None on the first subscribe()
+        self.ring_size = ring_size
+        self.ring_bytes = ring_bytes
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[LogSubscriber] = set()
+        self._ring: deque = deque()  # (seq, event, size)
+        self._ring_bytes = 0
+        self._next_seq = 0
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._ring_bytes
+
+    def publish(self, event: Dict[str, Any], size: Optional[int] = None) -> None:
+        """Append an event and wake subscribers; never blocks.
+
+        `size` is the event's serialized length, if the caller already has it.
+        """
+        if not self.subscribers:
+            return
+        if size is None:
+            size = len(json.dumps(event, ensure_ascii=False, default=str))
+        self._ring.append((self._next_seq, event, size))
+        self._ring_bytes += size
+        self._next_seq += 1
+        while self._ring and (len(self._ring) > self.ring_size or self._ring_bytes > self.ring_bytes):
+            self._evict()
+        for subscriber in tuple(self.subscribers):
+            subscriber.notify()
+
+    def _evict(self) -> None:
+        seq, event, size = self._ring.popleft()
+        self._ring_bytes -= size
+        for subscriber in self.subscribers:
+            if subscriber.cursor <= seq and subscriber.filter.matches(event):
+                subscriber.missed += 1
+
+    def _trim(self) -> None:
+        """Drop entries that every subscriber has already read."""
+        low = min((s.cursor for s in self.subscribers), default=self._next_seq)
+        while self._ring and self._ring[0][0] < low:
+            self._evict()
+
+    def _configure(self) -> None:
+        from core.config import config  # core.config imports this module via logging
+        if self.ring_size is None:
+            self.ring_size = config.log_stream_ring_size
+        if self.ring_bytes is None:
+            self.ring_bytes = config.log_stream_ring_bytes
+        if self.max_subscribers is None:
+            self.max_subscribers = config.log_stream_max_subscribers
+
+    def subscribe(self, log_filter: LogFilter) -> LogSubscriber:
+        if None in (self.ring_size, self.ring_bytes, self.max_subscribers):
+            self._configure()
+        if len(self.subscribers) >= self.max_subscribers:
+            raise RuntimeError(f"Too many log subscribers (max {self.max_subscribers})")
+        subscriber = LogSubscriber(log_filter, self._next_seq)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LogSubscriber) -> None:
+        self.subscribers.discard(subscriber)
+        self._trim()  # with nobody listening this empties the ring
+
+    def read(self, subscriber: LogSubscriber) -> Tuple[List[Dict[str, Any]], int]:
+        """Matching, projected events since the subscriber's cursor, and how many matching ones were missed."""
+        if subscriber.cursor >= self._next_seq:
+            return [], 0
+        oldest = self._ring[0][0] if self._ring else self._next_seq
+        start = max(subscriber.cursor, oldest) - oldest
+        entries = list(islice(self._ring, start, None))
+        subscriber.cursor = self._next_seq
+        dropped, subscriber.missed = subscriber.missed, 0
+        subscriber.dropped += dropped
+        self._trim()
+
+        log_filter = subscriber.filter
+        events = [log_filter.project(event) for _, event, _ in entries if log_filter.matches(event)]
+        subscriber.delivered += len(events)
+        return events, dropped
+
+
+log_broadcaster = LogBroadcaster()
@@ -7,6 +7,9 @@ import json
 import logging
 from typing import Dict
 
+from utils.diagnostics import DIAGNOSTICS_ENABLED, record_stage
+from utils.log_stream import log_broadcaster
+
 
 def setup_logging():
     """Setup logging configuration for the application."""
@@ -27,7 +30,15 @@ def setup_logging():
     return logging.getLogger("cursor-proxy")
 
 
-logger = setup_logging()
+_logger = None
+
+
+def get_logger() -> logging.Logger:
+    """Return the application logger, setting up file logging on first use."""
+    global _logger
+    if _logger is None:
+        _logger = setup_logging()
+    return _logger
 
 
 def _format_multiline_field(line: str, field: str) -> str:
@@ -50,6 +61,8 @@ def _format_multiline_field(line: str, field: str) -> str:
 
 def log_event(event_type: str, data: dict):
     """Log structured events as JSON with pretty formatting and readable newlines."""
+    if DIAGNOSTICS_ENABLED:
+        started = time.perf_counter()
     event = {
         "event": event_type,
         "timestamp": int(time.time()),
@@ -74,7 +87,11 @@ def log_event(event_type: str, data: dict):
         else:
             result_lines.append(line.replace('\\n', '\n'))
     
-    logger.info('\n'.join(result_lines))
+    get_logger().info('\n'.join(result_lines))
+    # Live /admin/logs/stream subscribers (no-op when nobody is subscribed)
+    log_broadcaster.publish(event, len(json_str))
+    if DIAGNOSTICS_ENABLED:
+        record_stage("log_event", time.perf_counter() - started)
 
 
 def redact_token(tok: str) -> str:
@@ -14,4 +14,21 @@ def sanitize_payload(body: Dict[str, Any]) -> Dict[str, Any]:
     if "max_tokens" in body:
         body["max_completion_tokens"] = body.pop("max_tokens")
     
-    return body
\ No newline at end of file
+    return body
+
+
+def ensure_stream_usage(body: Dict[str, Any]) -> bool:
+    """Request a final usage chunk for chat-completion streams.
+
+    Returns True if `stream_options.include_usage` was injected by the proxy
+    (the client did not ask for it). Returns False if the client already set
+    it, or sent `stream_options` that is not an object; that body is left
+    as is so upstream can reject it.
+    """
+    stream_options = body.get("stream_options")
+    if stream_options is None:
+        stream_options = {}
+    elif not isinstance(stream_options, dict) or stream_options.get("include_usage"):
+        return False
+    body["stream_options"] = dict(stream_options, include_usage=True)
+    return True
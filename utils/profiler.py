@@ -0,0 +1,73 @@
+"""
+On-demand sampling profiler for the event-loop thread.
+
+Imported only when an admin starts a profile, so it costs nothing otherwise.
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Optional
+
+
+class SamplingProfiler:
+    """Sample the stack of one thread from a background thread.
+
+    Output is in collapsed-stack format ("root;caller;callee count" per line),
+    which flamegraph.pl and speedscope accept directly.
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float, target_thread_id: int) -> None:
+        if self.running:
+            raise RuntimeError("profiler already running")
+        self._stop.clear()
+        self._stacks = Counter()
+        self.samples = 0
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._thread = threading.Thread(
+            target=self._run, args=(seconds, interval, target_thread_id),
+            name="diagnostics-profiler", daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.collapsed()
+
+    def _run(self, seconds: float, interval: float, target_thread_id: int) -> None:
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            frame = sys._current_frames().get(target_thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            self._stop.wait(interval)
+        self.stopped_at = time.time()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+
+profiler = SamplingProfiler()
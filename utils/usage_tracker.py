@@ -0,0 +1,263 @@
+"""
+In-memory token usage and cost accounting with periodic rollups to disk.
+
+Counters are kept per hour, redacted API key, model and endpoint, and are
+fed from every `response` event so spend can be queried without rereading
+the raw logs. Worker processes add their counts to one shared rollup file.
+"""
+import os
+import json
+import time
+import asyncio
+from typing import Dict, Any, Optional, Tuple, List
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # no file locking on Windows; run a single worker there
+
+from core.config import config
+from utils.logging_utils import log_event, redact_token
+
+# USD per 1M tokens: (input, cached input, output). Override with MODEL_PRICES JSON,
+# e.g. MODEL_PRICES='{"gpt-5": [1.25, 0.125, 10.0]}'
+DEFAULT_MODEL_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-5": (1.25, 0.125, 10.0),
+    "gpt-5-mini": (0.25, 0.025, 2.0),
+    "gpt-5-nano": (0.05, 0.005, 0.40),
+}
+
+COUNTER_FIELDS = (
+    "requests", "requests_without_usage",
+    "prompt_tokens", "completion_tokens", "cached_tokens", "reasoning_tokens",
+    "cost_usd",
+)
+GROUP_FIELDS = ("hour", "key", "model", "endpoint")
+
+
+def _load_prices() -> Dict[str, Tuple[float, float, float]]:
+    prices = dict(DEFAULT_MODEL_PRICES)
+    raw = os.getenv("MODEL_PRICES")
+    if raw:
+        try:
+            for model, values in json.loads(raw).items():
+                prices[model] = (float(values[0]), float(values[1]), float(values[2]))
+        except (ValueError, TypeError, IndexError, AttributeError) as e:
+            log_event("config_error", {"field": "MODEL_PRICES", "error": str(e)})
+    return prices
+
+
+MODEL_PRICES = _load_prices()
+
+
+def normalize_usage(usage: Dict[str, Any]) -> Dict[str, int]:
+    """Read token counts from Chat Completions or Responses API usage objects."""
+    prompt = usage.get("prompt_tokens", usage.get("input_tokens")) or 0
+    completion = usage.get("completion_tokens", usage.get("output_tokens")) or 0
+    prompt_details = usage.get("prompt_tokens_details") or usage.get("input_tokens_details") or {}
+    completion_details = usage.get("completion_tokens_details") or usage.get("output_tokens_details") or {}
+    return {
+        "prompt_tokens": int(prompt),
+        "completion_tokens": int(completion),
+        "cached_tokens": int(prompt_details.get("cached_tokens") or 0),
+        "reasoning_tokens": int(completion_details.get("reasoning_tokens") or 0),
+    }
+
+
+def estimate_cost(model: Optional[str], tokens: Dict[str, int]) -> float:
+    """Estimated USD cost; unknown models fall back to their longest known prefix."""
+    prices = MODEL_PRICES.get(model or "")
+    if prices is None and model:
+        for name in sorted(MODEL_PRICES, key=len, reverse=True):
+            if model.startswith(name):
+                prices = MODEL_PRICES[name]
+                break
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    cached = min(tokens["cached_tokens"], tokens["prompt_tokens"])
+    return (
+        (tokens["prompt_tokens"] - cached) * input_price
+        + cached * cached_price
+        + tokens["completion_tokens"] * output_price
+    ) / 1_000_000
+
+
+def _merge(target: Dict[tuple, Dict[str, float]], source: Dict[tuple, Dict[str, float]]) -> None:
+    """Add every counter of `source` into `target`."""
+    for key, values in source.items():
+        counters = target.get(key)
+        if counters is None:
+            counters = target[key] = dict.fromkeys(COUNTER_FIELDS, 0)
+        for field, value in values.items():
+            counters[field] += value
+
+
+def _parse_row(row: Dict[str, Any]) -> Tuple[Tuple[int, str, str, str], Dict[str, float]]:
+    """Validate one persisted rollup row; raises KeyError/TypeError/ValueError."""
+    key = (int(row["hour"]), str(row["key"]), str(row["model"]), str(row["endpoint"]))
+    values = {}
+    for field in COUNTER_FIELDS:
+        value = row.get(field, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f"{field} must be a number")
+        values[field] = value
+    return key, values
+
+
+class UsageTracker:
+    """Hourly usage counters keyed by (hour, redacted key, model, endpoint).
+
+    The rollup file is shared by every worker process (several run side by
+    side with WORKERS>1 and during reloads). Each process only keeps the
+    counts recorded since its last flush and adds them to the file under an
+    exclusive lock, so no writer overwrites another's totals.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        # Counts recorded since the last successful flush
+        self._pending: Dict[Tuple[int, str, str, str], Dict[str, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def path(self) -> str:
+        """Rollup file; USAGE_ROLLUP_PATH unless given explicitly."""
+        return config.usage_rollup_path if self._path is None else self._path
+
+    def record(self, auth: Optional[str], model: Optional[str], endpoint: Optional[str],
+               usage: Optional[Dict[str, Any]]) -> None:
+        """Add one response to the current hour's counters."""
+        hour = int(time.time()) // 3600 * 3600
+        key = (hour, redact_token(auth) if auth else "-", model or "-", endpoint or "-")
+        counters = self._pending.get(key)
+        if counters is None:
+            counters = self._pending[key] = dict.fromkeys(COUNTER_FIELDS, 0)
+        counters["requests"] += 1
+        if usage:
+            tokens = normalize_usage(usage)
+            for field, value in tokens.items():
+                counters[field] += value
+            counters["cost_usd"] += estimate_cost(model, tokens)
+        else:
+            counters["requests_without_usage"] += 1
+
+    def query(self, group_by: List[str], since: Optional[int] = None,
+              key: Optional[str] = None, model: Optional[str] = None,
+              endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Sum persisted and not yet flushed counters grouped by any of `GROUP_FIELDS`, newest hour first."""
+        rollups = self._read()
+        _merge(rollups, self._pending)
+
+        groups: Dict[tuple, Dict[str, float]] = {}
+        for (hour, k, m, e), counters in rollups.items():
+            if since is not None and hour < since:
+                continue
+            if (key and k != key) or (model and m != model) or (endpoint and e != endpoint):
+                continue
+            values = {"hour": hour, "key": k, "model": m, "endpoint": e}
+            group_key = tuple(values[f] for f in group_by)
+            total = groups.get(group_key)
+            if total is None:
+                total = groups[group_key] = dict.fromkeys(COUNTER_FIELDS, 0)
+            for field in COUNTER_FIELDS:
+                total[field] += counters[field]
+
+        rows = []
+        for group_key, total in groups.items():
+            row = dict(zip(group_by, group_key))
+            row.update(total)
+            row["cost_usd"] = round(row["cost_usd"], 6)
+            rows.append(row)
+        if "hour" in group_by:
+            rows.sort(key=lambda r: r["hour"], reverse=True)
+        return rows
+
+    # ---- Persistence ----
+
+    def _read(self) -> Dict[Tuple[int, str, str, str], Dict[str, float]]:
+        """Rollups currently on disk; invalid rows are logged and skipped."""
+        rollups: Dict[Tuple[int, str, str, str], Dict[str, float]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                rows = json.load(f)
+        except FileNotFoundError:
+            return rollups
+        except (OSError, ValueError) as e:
+            log_event("usage_rollup_error", {"stage": "load", "path": self.path, "error": str(e)})
+            return rollups
+        if not isinstance(rows, list):
+            log_event("usage_rollup_error", {"stage": "load", "path": self.path, "error": "Expected a list of rows"})
+            return rollups
+        for i, row in enumerate(rows):
+            try:
+                key, values = _parse_row(row)
+            except (KeyError, TypeError, ValueError) as e:
+                log_event("usage_rollup_error", {"stage": "load", "path": self.path, "row": i, "error": repr(e)})
+                continue
+            _merge(rollups, {key: values})
+        return rollups
+
+    def _take_pending(self) -> Optional[Dict[Tuple[int, str, str, str], Dict[str, float]]]:
+        """Hand over the counts recorded since the last flush (None if there are none)."""
+        if not self._pending:
+            return None
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def _write(self, pending: Dict[Tuple[int, str, str, str], Dict[str, float]]) -> bool:
+        """Add `pending` to the rollup file under an exclusive lock; False on failure."""
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path + ".lock", "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                rollups = self._read()
+                _merge(rollups, pending)
+                cutoff = int(time.time()) // 3600 * 3600 - config.usage_retention_hours * 3600
+                rows = [
+                    dict(zip(GROUP_FIELDS, key), **counters)
+                    for key, counters in sorted(rollups.items())
+                    if key[0] >= cutoff
+                ]
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(rows, f, separators=(",", ":"))
+                os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            log_event("usage_rollup_error", {"stage": "flush", "path": self.path, "error": str(e)})
+            return False
+
+    def flush(self) -> None:
+        """Add the counts recorded since the last flush to the rollup file."""
+        pending = self._take_pending()
+        if pending is not None and not self._write(pending):
+            _merge(self._pending, pending)  # keep them for the next flush
+
+    def start(self) -> None:
+        """Start the periodic flush task."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write a final rollup."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(config.usage_flush_seconds)
+            # Take the counts on the loop, merge them into the file off it
+            pending = self._take_pending()
+            if pending is not None and not await asyncio.to_thread(self._write, pending):
+                _merge(self._pending, pending)
+
+
+usage_tracker = UsageTracker()